@@ -1,4 +1,8 @@
-use std::{env, error::Error};
+use std::{
+    env,
+    error::Error,
+    io::{self, BufRead, Write},
+};
 
 use aws_nitro_enclaves_nsm_api::{
     api::{Request, Response},
@@ -6,14 +10,28 @@ use aws_nitro_enclaves_nsm_api::{
 };
 use serde_bytes::ByteBuf;
 
+/// Flag that starts the binary as a long-running attestation server.
+const SERVE_FLAG: &str = "--serve";
+
 /// Forward a request to the NSM and return its response.
 ///
 /// Provide user data, nonce and public key, in this order, as arguments. Provide an empty string
 /// for missing arguments.
+///
+/// Alternatively, provide `--serve`, followed by user data and public key: the binary will then
+/// read hex-encoded nonces from stdin, one per line, and print a response line for each one.
 fn main() -> Result<(), Box<dyn Error>> {
-    let args: Result<[_; 3], _> = env::args()
+    let args: Vec<_> = env::args()
         // Skip binary name
         .skip(1)
+        .collect();
+
+    if args.first().map(String::as_str) == Some(SERVE_FLAG) {
+        return serve(&args[1..]);
+    }
+
+    let args: Result<[_; 3], _> = args
+        .into_iter()
         .map(|arg| Some(ByteBuf::from(arg)))
         .collect::<Vec<_>>()
         .try_into();
@@ -29,24 +47,80 @@ fn main() -> Result<(), Box<dyn Error>> {
             );
         };
 
-        let request = Request::Attestation {
-            user_data,
-            nonce,
-            public_key,
-        };
+        attest(nsm_fd, user_data, nonce, public_key).map(|document| {
+            println!("Success: {document}");
+        })
+    };
+
+    nsm_exit(nsm_fd);
+
+    result
+}
 
-        match nsm_process_request(nsm_fd, request) {
-            Response::Attestation { document } => {
-                let document = hex::encode(document);
-                println!("Success: {document}");
-                Ok(())
+/// Serve attestation requests from stdin, until it's closed.
+///
+/// Each stdin line is a hex-encoded nonce, possibly empty, and is answered by a single stdout line,
+/// either `Success: $document` or `Error: $reason`.
+fn serve(args: &[String]) -> Result<(), Box<dyn Error>> {
+    let [user_data, public_key] = args else {
+        return Err("Attestation server should be called with `user_data` and `public_key`".into());
+    };
+    let user_data = Some(ByteBuf::from(user_data.as_bytes()));
+    let public_key = Some(ByteBuf::from(public_key.as_bytes()));
+
+    let nsm_fd = nsm_init();
+
+    let result: Result<(), Box<dyn Error>> = 'nsm: {
+        let mut stdout = io::stdout().lock();
+        for line in io::stdin().lock().lines() {
+            let line = match line {
+                Ok(line) => line,
+                Err(err) => break 'nsm Err(err.into()),
+            };
+
+            let response = hex::decode(line.trim())
+                .map_err(|err| -> Box<dyn Error> { format!("Invalid nonce: {err}").into() })
+                .and_then(|nonce| {
+                    attest(
+                        nsm_fd,
+                        user_data.clone(),
+                        Some(ByteBuf::from(nonce)),
+                        public_key.clone(),
+                    )
+                });
+
+            let written = match response {
+                Ok(document) => writeln!(stdout, "Success: {document}"),
+                Err(err) => writeln!(stdout, "Error: {err}"),
+            };
+            if let Err(err) = written.and_then(|_| stdout.flush()) {
+                break 'nsm Err(err.into());
             }
-            Response::Error(code) => Err(format!("{code:?}").into()),
-            response => Err(format!("Unexpected response: {response:?}").into()),
         }
+        Ok(())
     };
 
     nsm_exit(nsm_fd);
 
     result
 }
+
+/// Request an attestation document from the NSM and return it hex-encoded.
+fn attest(
+    nsm_fd: i32,
+    user_data: Option<ByteBuf>,
+    nonce: Option<ByteBuf>,
+    public_key: Option<ByteBuf>,
+) -> Result<String, Box<dyn Error>> {
+    let request = Request::Attestation {
+        user_data,
+        nonce,
+        public_key,
+    };
+
+    match nsm_process_request(nsm_fd, request) {
+        Response::Attestation { document } => Ok(hex::encode(document)),
+        Response::Error(code) => Err(format!("{code:?}").into()),
+        response => Err(format!("Unexpected response: {response:?}").into()),
+    }
+}
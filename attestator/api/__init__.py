@@ -2,11 +2,11 @@
 
 import logging
 import os
-import secrets
 
-import flask
+from aiohttp import web
 
-from .views import root_view
+from ..attestator_client.pool import AttestatorClientPool
+from .views import CLIENT_POOL, metrics_view, root_view
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -19,7 +19,19 @@ else:
     logger.info("%s not set, using client defaults", CLIENT_CONFIG_ENV)
     CLIENT_CONFIG = ""
 
-api_app = flask.Flask(__package__)
-api_app.config["SECRET_KEY"] = secrets.token_hex()
-api_app.config["client"] = CLIENT_CONFIG
-api_app.add_url_rule("/", view_func=root_view, methods=("POST",))
+
+async def client_pool_context(app):
+    """Keep a client connection pool open for the lifetime of `app`."""
+    pool = AttestatorClientPool.from_args(CLIENT_CONFIG.split())
+    await pool.start()
+    app[CLIENT_POOL] = pool
+
+    yield
+
+    await pool.close()
+
+
+api_app = web.Application()
+api_app.cleanup_ctx.append(client_pool_context)
+api_app.router.add_post("/", root_view)
+api_app.router.add_get("/metrics", metrics_view)
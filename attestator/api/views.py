@@ -1,63 +1,169 @@
 """App views"""
 
-import asyncio
 import logging
 
-from flask import current_app as app, request
+from aiohttp import web
 
-from ..attestator_client.main import main as client_main
-from ..messages import GET_ATTESTATION, SIGN_EVENT, SUCCESS_RESPONSE
+from ..attestator_client.pool import AttestatorClientPool
+from ..messages import (
+    GET_ATTESTATION,
+    METRICS,
+    PARTIAL_RESPONSE,
+    PROMETHEUS_METRICS,
+    SIGN_BLOCK_RANGE,
+    SIGN_EVENT,
+    SIGN_EVENTS,
+    SUCCESS_RESPONSE,
+)
 
 
-def get_signed_event(req_json):
+CLIENT_POOL = web.AppKey("client_pool", AttestatorClientPool)
+
+
+async def get_signed_event(request, req_json):
     """Return signed events to the root view."""
     try:
         chain_id, tx_id = req_json.get("params", [])[0:2]
     except ValueError:
-        return 'missing argument, pass "params = [chain_id, tx_id]"', 400
-
-    client_args = app.config["client"].split()
+        return web.Response(
+            text='missing argument, pass "params = [chain_id, tx_id]"', status=400
+        )
 
     try:
-        response = asyncio.run(client_main(client_args + [SIGN_EVENT, chain_id, tx_id]))
+        response = await request.app[CLIENT_POOL].request(SIGN_EVENT, [chain_id, tx_id])
         if response.response_type == SUCCESS_RESPONSE:
-            return {"result": response.response}
+            return web.json_response({"result": response.response})
     except Exception as exc:
         logger = logging.getLogger(__name__)
         logger.exception("signed event got exception %s", exc)
 
-    return "something went wrong", 500
+    return web.Response(text="something went wrong", status=500)
+
+
+async def get_signed_events(request, req_json):
+    """Return signed events for each `[chain_id, tx_id]` pair to the root view."""
+    params = req_json.get("params", [])
+    if not params or not all(
+        isinstance(p, list) and len(p) == 2 and all(isinstance(e, str) for e in p)
+        for p in params
+    ):
+        return web.Response(
+            text='bad arguments, pass "params = [[chain_id, tx_id], ...]"', status=400
+        )
+
+    try:
+        response = await request.app[CLIENT_POOL].request(SIGN_EVENTS, params)
+        if response.response_type == SUCCESS_RESPONSE:
+            return web.json_response(
+                {
+                    "result": [
+                        (
+                            {"result": r["response"]}
+                            if r["response_type"] == SUCCESS_RESPONSE
+                            else {"error": r["response"]}
+                        )
+                        for r in response.response
+                    ]
+                }
+            )
+    except Exception as exc:
+        logger = logging.getLogger(__name__)
+        logger.exception("signed events got exception %s", exc)
+
+    return web.Response(text="something went wrong", status=500)
+
+
+async def get_signed_block_range(request, req_json):
+    """Return signed events between two blocks, included, to the root view.
+
+    Events already signed are returned together with the error, if the server fails midway."""
+    params = req_json.get("params", [])
+    if (
+        len(params) != 3
+        or not isinstance(params[0], str)
+        or not all(isinstance(p, int) and not isinstance(p, bool) for p in params[1:])
+    ):
+        return web.Response(
+            text='bad arguments, pass "params = [chain_id, from_block, to_block]"',
+            status=400,
+        )
+
+    signed_events = []
+    try:
+        async for response in request.app[CLIENT_POOL].stream(SIGN_BLOCK_RANGE, params):
+            if response.response_type == PARTIAL_RESPONSE:
+                signed_events.extend(response.response[2])
+            elif response.response_type == SUCCESS_RESPONSE:
+                return web.json_response({"result": signed_events})
+            else:
+                return web.json_response(
+                    {"result": signed_events, "error": response.response}
+                )
+    except Exception as exc:
+        logger = logging.getLogger(__name__)
+        logger.exception("signed block range got exception %s", exc)
+
+    return web.Response(text="something went wrong", status=500)
 
 
-def get_signer_details():
-    """Return signer details to the root view."""
-    client_args = app.config["client"].split()
+async def get_signer_details(request, req_json):
+    """Return signer details, attested with an optional `nonce` param, to the root view."""
+    nonce = req_json.get("params", [])[0:1]
+    if not all(isinstance(n, str) for n in nonce):
+        return web.Response(
+            text='bad argument, pass "params = [nonce]" or "params = []"', status=400
+        )
 
     try:
-        response = asyncio.run(client_main(client_args + [GET_ATTESTATION]))
+        response = await request.app[CLIENT_POOL].request(GET_ATTESTATION, nonce)
         if response.response_type == SUCCESS_RESPONSE:
             address, pub_k, attestation = response.response
-            return {
-                "result": {
-                    "publicKey": pub_k,
-                    "account": address,
-                    "attestation": attestation,
+            return web.json_response(
+                {
+                    "result": {
+                        "publicKey": pub_k,
+                        "account": address,
+                        "attestation": attestation,
+                    }
                 }
-            }
+            )
     except Exception as exc:
         logger = logging.getLogger(__name__)
         logger.exception("signer details got exception %s", exc)
 
-    return "something went wrong", 500
+    return web.Response(text="something went wrong", status=500)
+
+
+async def metrics_view(request):
+    """Metrics view, returns the EA Server metrics in the Prometheus text format."""
+    try:
+        response = await request.app[CLIENT_POOL].request(METRICS, [PROMETHEUS_METRICS])
+        if response.response_type == SUCCESS_RESPONSE:
+            return web.Response(text=response.response[0], content_type="text/plain")
+    except Exception as exc:
+        logger = logging.getLogger(__name__)
+        logger.exception("metrics got exception %s", exc)
+
+    return web.Response(text="something went wrong", status=500)
 
 
-def root_view():
+async def root_view(request):
     """Root view."""
-    req_json = request.json
+    try:
+        req_json = await request.json()
+    except ValueError:
+        return web.Response(text="bad request, expected a json body", status=400)
+
     if (method := req_json.get("method", "")) == "getSignedEvent":
-        return get_signed_event(req_json)
+        return await get_signed_event(request, req_json)
+
+    if method == "getSignedEvents":
+        return await get_signed_events(request, req_json)
+
+    if method == "getSignedBlockRange":
+        return await get_signed_block_range(request, req_json)
 
     if method == "getSignerDetails":
-        return get_signer_details()
+        return await get_signer_details(request, req_json)
 
-    return f'bad method: "{method}"', 400
+    return web.Response(text=f'bad method: "{method}"', status=400)
@@ -12,4 +12,7 @@ logging.basicConfig(level=logging.DEBUG)
 
 ret = asyncio.run(main(sys.argv[1:]))
 
-pprint.pp(ret)
+if isinstance(ret, str):
+    print(ret, end="")
+else:
+    pprint.pp(ret)
@@ -1,13 +1,17 @@
 """Attestator client."""
 
+import asyncio
+import itertools
 import logging
+import time
 
 
 from ..messages import (
+    JSON_FRAMING,
+    PARTIAL_RESPONSE,
+    VSockConnection,
     VSockRequest,
     VSockResponse,
-    dict_to_vsock_message,
-    vsock_message_to_dict,
 )
 
 
@@ -15,20 +19,138 @@ logger = logging.getLogger(__name__)
 
 
 class AttestatorClient:
-    """AttestatorClient class."""
+    """AttestatorClient class.
 
-    async def run(self, cmd, cmd_args, reader, writer):
-        """Run `cmd` on the server through the given `reader` and `writer` pair."""
-        address, port = writer.get_extra_info("socket").getsockname()
+    Requests are multiplexed over the connection of the given `reader` and `writer` pair: each
+    request is tagged with an id, and matched with its response, regardless of the order in which
+    responses are received. The message `framing` is announced to the server on creation."""
+
+    def __init__(self, reader, writer, framing=JSON_FRAMING):
+        self.writer = writer
+        self.connection = VSockConnection.connect(reader, writer, framing)
+
+        self.request_ids = itertools.count()
+        # Maps request ids to the futures awaiting their response, or to the queues of the
+        # responses of streamed requests
+        self.pending = {}
+        self.receiver = None
+        # Monotonic time of the latest response, `None` until one is received
+        self.received_at = None
+
+    @property
+    def closed(self):
+        """Return whether the connection can't be used for new requests anymore."""
+        return self.writer.is_closing() or (
+            self.receiver is not None and self.receiver.done()
+        )
+
+    async def receive(self):
+        """Resolve pending requests with their responses, until the connection is closed."""
+        exc = None
+        try:
+            async for msg in self.connection:
+                self.received_at = time.monotonic()
+                response = VSockResponse.from_json(msg)
+                if (waiter := self.pending.get(response.request_id)) is None:
+                    logger.warning("Dropping unexpected response %s", response)
+                elif isinstance(waiter, asyncio.Queue):
+                    waiter.put_nowait(response)
+                elif not waiter.done():
+                    waiter.set_result(response)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            exc = e
+
+        for waiter in self.pending.values():
+            error = ConnectionError(
+                f"Connection closed before receiving a response: {exc}"
+            )
+            if isinstance(waiter, asyncio.Queue):
+                waiter.put_nowait(error)
+            elif not waiter.done():
+                waiter.set_exception(error)
+
+    async def send(self, cmd, cmd_args, waiter):
+        """Send `cmd` to the server, with `waiter` awaiting its responses, return the request id."""
+        if self.closed:
+            raise ConnectionError("Client connection closed")
+        if self.receiver is None:
+            self.receiver = asyncio.create_task(self.receive())
+
+        request_id = next(self.request_ids)
+        self.pending[request_id] = waiter
+        try:
+            request = VSockRequest(
+                request_type=cmd, args=cmd_args, request_id=request_id
+            ).as_dict()
+            logger.debug("Sending request %d", request_id)
+            self.connection.write(request)
+            await self.writer.drain()
+        except BaseException:
+            del self.pending[request_id]
+            raise
+
+        return request_id
+
+    async def request(self, cmd, cmd_args):
+        """Send `cmd` to the server and return its response.
+
+        Can be called concurrently, any number of times, until the client is closed."""
+        future = asyncio.get_running_loop().create_future()
+        request_id = await self.send(cmd, cmd_args, future)
+        try:
+            response = await future
+            logger.debug("Received response %d", request_id)
+            return response
+        finally:
+            del self.pending[request_id]
+
+    async def stream(self, cmd, cmd_args):
+        """Send the streamed `cmd` to the server, yield its partial responses, then its final one.
+
+        Can be called concurrently with any other request, until the client is closed."""
+        queue = asyncio.Queue()
+        request_id = await self.send(cmd, cmd_args, queue)
+        try:
+            while True:
+                response = await queue.get()
+                if isinstance(response, Exception):
+                    raise response
+                yield response
+
+                if response.response_type != PARTIAL_RESPONSE:
+                    logger.debug("Received final response %d", request_id)
+                    return
+        finally:
+            del self.pending[request_id]
+
+    async def close(self):
+        """Close the connection, failing any pending request."""
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        if self.receiver is not None:
+            await self.receiver
+
+    async def run(self, cmd, cmd_args):
+        """Run `cmd` on the server, then close the connection."""
+        address, port = self.writer.get_extra_info("socket").getsockname()
         logger.info("Client started on %s:%d", address, port)
 
-        request = VSockRequest(request_type=cmd, args=cmd_args).as_dict()
-        logger.info("Sending request")
-        writer.writelines([dict_to_vsock_message(request)])
-        writer.write_eof()
-        await writer.drain()
+        try:
+            return await self.request(cmd, cmd_args)
+        finally:
+            await self.close()
 
-        resp = await reader.readline()
-        logger.info("Received response %s", resp)
+    async def run_stream(self, cmd, cmd_args):
+        """Run the streamed `cmd` on the server, then close the connection.
+
+        Return every response, the partial ones first."""
+        address, port = self.writer.get_extra_info("socket").getsockname()
+        logger.info("Client started on %s:%d", address, port)
 
-        return VSockResponse.from_json(vsock_message_to_dict(resp))
+        try:
+            return [response async for response in self.stream(cmd, cmd_args)]
+        finally:
+            await self.close()
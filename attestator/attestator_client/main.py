@@ -5,16 +5,21 @@ import asyncio
 import socket
 
 
+from ..messages import (
+    BINARY_FRAMING,
+    FRAMINGS,
+    MAX_MESSAGE_SIZE,
+    METRICS,
+    PROMETHEUS_METRICS,
+    SIGN_BLOCK_RANGE,
+    SIGN_EVENTS,
+    SUCCESS_RESPONSE,
+)
 from .client import AttestatorClient
 
 
-async def main(args):
-    """Setup and run the attestator client."""
-    parser = argparse.ArgumentParser(prog=__package__)
-    parser.add_argument("cmd", help="command to pass to the attestator server")
-    parser.add_argument(
-        "cmd_args", nargs="*", help="command arguments to pass to the attestator server"
-    )
+def add_connection_arguments(parser):
+    """Add the arguments needed to connect to the attestator server to `parser`."""
     parser.add_argument(
         "-c",
         "--cid",
@@ -40,16 +45,70 @@ async def main(args):
         action="store_true",
         help="assume the client is connecting to a server started inside a normal docker container",
     )
-    args = parser.parse_args(args)
+    parser.add_argument(
+        "-f",
+        "--framing",
+        choices=FRAMINGS,
+        default=BINARY_FRAMING,
+        help="message framing on the connection",
+    )
 
+
+async def open_connection(args):
+    """Return a reader and writer pair connected to the attestator server, as set by `args`."""
     if args.debug:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((args.host, args.port))
+        address = (args.host, args.port)
     else:
         sock = socket.socket(socket.AF_VSOCK, socket.SOCK_STREAM)
-        sock.connect((args.cid, args.port))
+        address = (args.cid, args.port)
+
+    sock.setblocking(False)
+    try:
+        await asyncio.get_running_loop().sock_connect(sock, address)
+    except BaseException:
+        sock.close()
+        raise
+
+    return await asyncio.open_connection(sock=sock, limit=MAX_MESSAGE_SIZE)
+
+
+async def main(args):
+    """Setup and run the attestator client."""
+    parser = argparse.ArgumentParser(prog=__package__)
+    parser.add_argument("cmd", help="command to pass to the attestator server")
+    parser.add_argument(
+        "cmd_args", nargs="*", help="command arguments to pass to the attestator server"
+    )
+    add_connection_arguments(parser)
+    args = parser.parse_args(args)
+
+    cmd_args = args.cmd_args
+    if args.cmd == SIGN_EVENTS:
+        # Batch requests expect `[chain, tx_id]` pairs
+        if len(cmd_args) % 2:
+            parser.error(f"{SIGN_EVENTS} expects chain and tx_id pairs")
+        cmd_args = [list(pair) for pair in zip(cmd_args[::2], cmd_args[1::2])]
+    elif args.cmd == SIGN_BLOCK_RANGE:
+        # Block range requests expect `chain, from_block, to_block`, with integer blocks
+        try:
+            chain, from_block, to_block = cmd_args
+            cmd_args = [chain, int(from_block, 0), int(to_block, 0)]
+        except ValueError:
+            parser.error(f"{SIGN_BLOCK_RANGE} expects chain, from_block and to_block")
+
+    reader, writer = await open_connection(args)
 
-    reader, writer = await asyncio.open_connection(sock=sock)
+    attestator_client = AttestatorClient(reader, writer, args.framing)
+    if args.cmd == SIGN_BLOCK_RANGE:
+        return await attestator_client.run_stream(args.cmd, cmd_args)
 
-    attestator_client = AttestatorClient()
-    return await attestator_client.run(args.cmd, args.cmd_args, reader, writer)
+    response = await attestator_client.run(args.cmd, cmd_args)
+    if (
+        args.cmd == METRICS
+        and cmd_args in ([], [PROMETHEUS_METRICS])
+        and response.response_type == SUCCESS_RESPONSE
+    ):
+        # Returned as is, to be printed as text
+        return response.response[0]
+    return response
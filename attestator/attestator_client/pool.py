@@ -0,0 +1,151 @@
+"""Attestator client connection pool."""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+
+
+from ..messages import PING, SUCCESS_RESPONSE
+from .client import AttestatorClient
+from .main import add_connection_arguments, open_connection
+
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_HEALTH_CHECK_INTERVAL = 10.0
+DEFAULT_HEALTH_CHECK_TIMEOUT = 5.0
+
+
+logger = logging.getLogger(__name__)
+
+
+class AttestatorClientPool:
+    """AttestatorClientPool class.
+
+    Keeps up to `size` multiplexed connections to the attestator server and spreads requests among
+    them, round-robin. Connections are opened on demand, periodically pinged, and re-opened once
+    closed, so that a single event loop can keep any number of requests in flight."""
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        connection_args,
+        size=DEFAULT_POOL_SIZE,
+        health_check_interval=DEFAULT_HEALTH_CHECK_INTERVAL,
+        health_check_timeout=DEFAULT_HEALTH_CHECK_TIMEOUT,
+    ):
+        self.connection_args = connection_args
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+
+        self.clients = [None] * size
+        # Avoid opening more than one connection per slot at once
+        self.locks = [asyncio.Lock() for _ in range(size)]
+        self.slots = itertools.cycle(range(size))
+        self.health_checker = None
+
+    @classmethod
+    def from_args(cls, args):
+        """Build an AttestatorClientPool from client command line style `args`."""
+        parser = argparse.ArgumentParser(prog=__name__)
+        add_connection_arguments(parser)
+        parser.add_argument(
+            "--pool-size",
+            type=int,
+            default=DEFAULT_POOL_SIZE,
+            help="number of connections to the attestator server",
+        )
+        parser.add_argument(
+            "--health-check-interval",
+            type=float,
+            default=DEFAULT_HEALTH_CHECK_INTERVAL,
+            help="seconds between connection health checks",
+        )
+        args = parser.parse_args(args)
+
+        return cls(
+            args, size=args.pool_size, health_check_interval=args.health_check_interval
+        )
+
+    async def start(self):
+        """Start checking the pool connections health."""
+        self.health_checker = asyncio.create_task(self.check_health())
+
+    async def close(self):
+        """Stop checking the pool health and close every connection."""
+        if self.health_checker is not None:
+            self.health_checker.cancel()
+            self.health_checker = None
+
+        clients, self.clients = self.clients, [None] * self.size
+        await asyncio.gather(
+            *(c.close() for c in clients if c is not None), return_exceptions=True
+        )
+
+    async def get_client(self, slot):
+        """Return the client in `slot`, (re)connecting it if needed."""
+        async with self.locks[slot]:
+            if (client := self.clients[slot]) is None or client.closed:
+                logger.info("Connecting pool slot %d", slot)
+                reader, writer = await open_connection(self.connection_args)
+                client = self.clients[slot] = AttestatorClient(
+                    reader, writer, self.connection_args.framing
+                )
+            return client
+
+    async def request(self, cmd, cmd_args):
+        """Send `cmd` to the server through the next pool connection and return its response.
+
+        Requests failing due to a lost connection are retried once, on another connection."""
+        try:
+            client = await self.get_client(next(self.slots))
+            return await client.request(cmd, cmd_args)
+        except ConnectionError as exc:
+            logger.info("Retrying %s after connection failure: %s", cmd, exc)
+
+        client = await self.get_client(next(self.slots))
+        return await client.request(cmd, cmd_args)
+
+    async def stream(self, cmd, cmd_args):
+        """Send the streamed `cmd` through the next pool connection, yield its responses.
+
+        Streams are not retried, since their partial responses might already be consumed."""
+        client = await self.get_client(next(self.slots))
+        async for response in client.stream(cmd, cmd_args):
+            yield response
+
+    async def check_health(self):
+        """Periodically ping every open connection, closing those that don't respond.
+
+        Connections that received a response since the last check are not pinged. Busy connections
+        are only closed on connection errors: pings can queue behind their requests."""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for slot, client in enumerate(self.clients):
+                if client is None or client.closed:
+                    continue
+                if (
+                    client.received_at is not None
+                    and time.monotonic() - client.received_at
+                    < self.health_check_interval
+                ):
+                    continue
+
+                busy = bool(client.pending)
+                try:
+                    response = await asyncio.wait_for(
+                        client.request(PING, []), self.health_check_timeout
+                    )
+                    healthy = response.response_type == SUCCESS_RESPONSE
+                except ConnectionError:
+                    healthy = False
+                except asyncio.TimeoutError:
+                    healthy = busy
+                    if busy:
+                        logger.info("Busy pool slot %d missed its ping", slot)
+
+                if not healthy:
+                    logger.warning("Closing unhealthy pool slot %d", slot)
+                    await client.close()
@@ -5,6 +5,7 @@ import asyncio
 import logging
 import socket
 
+from ..messages import MAX_MESSAGE_SIZE
 from .server import AttestatorServer
 
 
@@ -51,10 +52,16 @@ async def main():
     sock.listen(SOCK_BACKLOG)
 
     attestator_server = AttestatorServer.from_config_toml(args.config, args.cert)
+    attestator_server.start()
 
-    server = await asyncio.start_server(attestator_server.run, sock=sock)
+    server = await asyncio.start_server(
+        attestator_server.run, sock=sock, limit=MAX_MESSAGE_SIZE
+    )
 
-    await server.serve_forever()
+    try:
+        await server.serve_forever()
+    finally:
+        await attestator_server.close()
 
 
 logging.basicConfig(level=logging.DEBUG)
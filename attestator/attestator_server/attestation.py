@@ -0,0 +1,106 @@
+"""NSM attestation helper."""
+
+import asyncio
+import logging
+
+
+ATTESTATION_EXEC = "./attestation"
+SERVE_FLAG = "--serve"
+SUCCESS_PREFIX = "Success:"
+# Attestation documents are a few KiB, hex-encoded
+MAX_LINE_SIZE = 2**20
+# Seconds to wait for the attestation of a nonce before restarting the binary
+ATTESTATION_TIMEOUT = 10
+
+
+logger = logging.getLogger(__name__)
+
+
+class AttestationHelper:
+    """AttestationHelper class.
+
+    Drives a long-running attestation binary, started once with the configuration and public key,
+    and fed a hex-encoded nonce per request over its stdin. Concurrent requests for the same nonce
+    share a single attestation document."""
+
+    def __init__(self, user_data, public_key, executable=ATTESTATION_EXEC):
+        self.user_data = user_data
+        self.public_key = public_key
+        self.executable = executable
+
+        self.process = None
+        # Serializes requests, the binary answers one line per nonce, in order
+        self.lock = asyncio.Lock()
+        # Maps nonces to the futures awaiting their attestation
+        self.pending = {}
+
+    @classmethod
+    def from_config_file(cls, config, public_key, executable=ATTESTATION_EXEC):
+        """Build an AttestationHelper attesting the content of the `config` file."""
+        with open(config, encoding="utf-8") as config_file:
+            # Strip trailing newlines as the shell `$(cat config)` did
+            user_data = config_file.read().rstrip("\n")
+        return cls(user_data, public_key, executable)
+
+    async def start(self):
+        """Start the attestation binary, if not already running."""
+        if self.process is not None and self.process.returncode is None:
+            return
+
+        logger.info("Starting %s attestation server", self.executable)
+        self.process = await asyncio.create_subprocess_exec(
+            self.executable,
+            SERVE_FLAG,
+            self.user_data,
+            self.public_key,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=MAX_LINE_SIZE,
+        )
+
+    async def close(self):
+        """Stop the attestation binary, closing its stdin."""
+        if (process := self.process) is None:
+            return
+        self.process = None
+
+        if process.returncode is None:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), 5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+    async def request(self, nonce):
+        """Return the raw output line of the attestation binary for the hex-encoded `nonce`."""
+        async with self.lock:
+            try:
+                await self.start()
+                self.process.stdin.write(f"{nonce}\n".encode())
+                await self.process.stdin.drain()
+                line = await asyncio.wait_for(
+                    self.process.stdout.readline(), ATTESTATION_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                line = b""
+                logger.warning("Attestation server timed out, killing it")
+                self.process.kill()
+            except (ConnectionError, OSError, ValueError) as exc:
+                line = b""
+                logger.warning("Attestation server failed: %s", exc)
+
+            if not line.endswith(b"\n"):
+                # The binary exited, hung or broke its protocol, restart it on the next request
+                await self.close()
+                return f"Attestation server exited: {line.decode(errors='replace')}"
+            return line.decode().strip()
+
+    async def attest(self, nonce=""):
+        """Return the attestation binary output for the hex-encoded `nonce`.
+
+        Successful outputs start with `SUCCESS_PREFIX`, followed by the attestation document."""
+        if (future := self.pending.get(nonce)) is None:
+            future = self.pending[nonce] = asyncio.ensure_future(self.request(nonce))
+            future.add_done_callback(lambda _: self.pending.pop(nonce, None))
+        return await asyncio.shield(future)
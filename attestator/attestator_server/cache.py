@@ -0,0 +1,100 @@
+"""Signed events cache."""
+
+import collections
+import json
+import time
+
+
+DEFAULT_TTL = 3600
+# Transactions without events might only be missing from the endpoints indexes so far
+DEFAULT_EMPTY_TTL = 30
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_SIZE = 2**26
+
+
+class SignedEventCache:
+    """SignedEventCache class.
+
+    Least recently used cache with expiring entries, bounded both in number of entries and in their
+    overall size. Entry sizes are estimated through their json serialization. Empty values expire
+    after `empty_ttl` seconds rather than `ttl`."""
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        ttl=DEFAULT_TTL,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        max_size=DEFAULT_MAX_SIZE,
+        empty_ttl=DEFAULT_EMPTY_TTL,
+    ):
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self.max_entries = max_entries
+        self.max_size = max_size
+
+        # Maps keys to `(expiry, size, value)` triples, least recently used first
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a SignedEventCache from the optional `cache` configuration section."""
+        return cls(
+            ttl=config.get("ttl", DEFAULT_TTL),
+            max_entries=config.get("max_entries", DEFAULT_MAX_ENTRIES),
+            max_size=config.get("max_size", DEFAULT_MAX_SIZE),
+            empty_ttl=config.get("empty_ttl", DEFAULT_EMPTY_TTL),
+        )
+
+    def get(self, key):
+        """Return the value cached for `key`, `None` if missing or expired."""
+        if (entry := self.entries.get(key)) is None:
+            self.misses += 1
+            return None
+
+        expiry, _, value = entry
+        if expiry < time.monotonic():
+            self.pop(key)
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Cache `value` for `key`, evicting least recently used entries if needed.
+
+        Values that can't fit the cache are not cached, and replace any value cached for `key`."""
+        size = len(json.dumps(value))
+        self.pop(key)
+        if size > self.max_size or self.max_entries < 1:
+            # The previous value, if any, is outdated all the same
+            return
+
+        ttl = self.ttl if value else self.empty_ttl
+        self.entries[key] = (time.monotonic() + ttl, size, value)
+        self.size += size
+
+        while len(self.entries) > self.max_entries or self.size > self.max_size:
+            _, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def pop(self, key):
+        """Remove `key` from the cache, if present."""
+        if (entry := self.entries.pop(key, None)) is not None:
+            self.size -= entry[1]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        """Return whether `key` is cached and not expired, without counting a hit or a miss."""
+        return (entry := self.entries.get(key)) is not None and (
+            entry[0] >= time.monotonic()
+        )
@@ -0,0 +1,190 @@
+"""EOS event pre-signing."""
+
+import asyncio
+import collections
+import logging
+import time
+
+from ..chain import CHAIN, EOS, ChainException
+from ..chain.core import sign_events_batch
+from ..chain.eos.rpc import get_eos_actions
+from ..utils import format_url
+from .cache import SignedEventCache
+
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_LIMIT = 100
+# Transactions failing to be signed are usually not indexed by enough endpoints yet
+DEFAULT_RETRY_DELAY = 30.0
+
+
+logger = logging.getLogger(__name__)
+
+
+class EosPresigner:
+    """EosPresigner class.
+
+    Polls the latest `limit` actions matching the events of the EOS chain `state` from its endpoints
+    every `interval` seconds, through Hyperion's action history. Transactions reported by at least
+    the consensus threshold of endpoints are signed for `version` as `sign-event` would, and kept in
+    the bounded `store`, keyed by `(chain, tx_id, version)`, for requests to be served from.
+    Transactions failing to be signed are not retried for `retry_delay` seconds.
+
+    Transactions are signed through the `sign` coroutine function, called as `sign_batch` is. The
+    server replaces it so that pre-signing shares its in flight signings."""
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(
+        self,
+        chain,
+        state,
+        version,
+        *,
+        store=None,
+        interval=DEFAULT_INTERVAL,
+        limit=DEFAULT_LIMIT,
+        retry_delay=DEFAULT_RETRY_DELAY,
+    ):
+        self.chain = chain
+        self.state = state
+        self.version = version
+        self.store = SignedEventCache() if store is None else store
+        self.interval = interval
+        self.limit = limit
+        self.retry_delay = retry_delay
+
+        self.sign = self.sign_batch
+        self.task = None
+        # Maps the transactions that failed to be signed to when they may be retried
+        self.retry_at = {}
+
+        self.polls = 0
+        self.presigned = 0
+        self.failed = 0
+
+    @classmethod
+    def from_config(cls, chain, state, version, config):
+        """Build an EosPresigner from the optional chain `presign` configuration section.
+
+        The store is configured as the signed events cache, from the same section."""
+        if CHAIN[chain]["protocol"] != EOS:
+            raise ChainException(f"Pre-signing not supported for chain {chain}")
+
+        return cls(
+            chain,
+            state,
+            version,
+            store=SignedEventCache.from_config(config),
+            interval=config.get("interval", DEFAULT_INTERVAL),
+            limit=config.get("limit", DEFAULT_LIMIT),
+            retry_delay=config.get("retry_delay", DEFAULT_RETRY_DELAY),
+        )
+
+    def start(self):
+        """Start polling, if not already started."""
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self):
+        """Stop polling, cancelling any pending poll."""
+        if (task := self.task) is None:
+            return
+        self.task = None
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def get(self, tx_id):
+        """Return the pre-signed events for `tx_id`, `None` if missing."""
+        return self.store.get((self.chain, tx_id, self.version))
+
+    async def sign_batch(self, tx_ids, store):
+        """Sign `tx_ids` and put the successfully signed ones in `store`.
+
+        Return the signed events or `ChainException` of each of `tx_ids`, in order."""
+        signed_events = await sign_events_batch(
+            tx_ids, self.chain, self.state, self.version
+        )
+        for tx_id, tx_signed_events in zip(tx_ids, signed_events):
+            if not isinstance(tx_signed_events, ChainException):
+                store.put((self.chain, tx_id, self.version), tx_signed_events)
+        return signed_events
+
+    async def run(self):
+        """Poll every `interval` seconds, until stopped."""
+        logger.info("Pre-signing %s events every %ss", self.chain, self.interval)
+        while True:
+            try:
+                await self.poll()
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.exception("Pre-signing %s got exception %s", self.chain, exc)
+            await asyncio.sleep(self.interval)
+
+    async def poll(self):
+        """Pre-sign the transactions of the latest matching actions, not pre-signed yet.
+
+        Transactions that recently failed to be signed are skipped."""
+        endpoints = self.state.select_endpoints()
+        results = await asyncio.gather(
+            *(
+                endpoint.track(
+                    get_eos_actions(
+                        self.state.event_index,
+                        self.limit,
+                        endpoint.url,
+                        session=self.state.session,
+                        max_size=self.state.max_response_size,
+                    )
+                )
+                for endpoint in endpoints
+            ),
+            return_exceptions=True,
+        )
+        self.polls += 1
+
+        # Counts the endpoints reporting each transaction, in order of appearance
+        reported = collections.Counter()
+        for endpoint, actions in zip(endpoints, results):
+            if isinstance(actions, Exception):
+                logger.debug("Pre-signing %s skips endpoint: %s", self.chain, actions)
+                continue
+
+            tx_ids = dict.fromkeys(
+                a.get("trx_id") for a in actions if isinstance(a, dict)
+            )
+            reported.update(t for t in tx_ids if isinstance(t, str))
+            # Every action being new, older ones might have been missed since the last poll
+            if (
+                self.polls > 1
+                and len(actions) >= self.limit
+                and all((self.chain, t, self.version) not in self.store for t in tx_ids)
+            ):
+                logger.warning(
+                    "Pre-signing %s may miss events from %s, consider raising its limit",
+                    self.chain,
+                    format_url(endpoint.url),
+                )
+
+        now = time.monotonic()
+        self.retry_at = {t: at for t, at in self.retry_at.items() if at > now}
+        tx_ids = [
+            tx_id
+            for tx_id, count in reported.items()
+            if count >= self.state.threshold
+            and tx_id not in self.retry_at
+            and (self.chain, tx_id, self.version) not in self.store
+        ]
+        if not tx_ids:
+            return
+
+        signed_events = await self.sign(tx_ids, self.store)
+        for tx_id, tx_signed_events in zip(tx_ids, signed_events):
+            if isinstance(tx_signed_events, ChainException):
+                self.failed += 1
+                self.retry_at[tx_id] = time.monotonic() + self.retry_delay
+                logger.info("Pre-signing %s failed: %s", tx_id, tx_signed_events)
+            else:
+                self.presigned += 1
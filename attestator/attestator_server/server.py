@@ -1,34 +1,72 @@
 """Attestator server."""
 
+import asyncio
+import contextlib
+import functools
 import logging
-import os
+import resource
+import time
 
 import toml
 
-from ..crypto import pk_to_pub
+from ..crypto import SigningEngine, pk_to_pub
 from ..chain import ChainException, ChainState
-from ..chain.core import create_chain_state_from_config, sign_events
+from ..chain.endpoint import CLOSED
+from ..chain.core import (
+    capture_chain_exception,
+    create_chain_state_from_config,
+    sign_block_range,
+    sign_events,
+    sign_events_batch,
+)
 from ..messages import (
     ERROR_RESPONSE,
     GET_ATTESTATION,
+    INTERNAL_ERROR,
+    INVALID_ARGUMENTS,
     INVALID_REQUEST_TYPE,
+    JSON_METRICS,
+    METRICS,
     NOT_ENOUGH_ARGUMENTS,
     NO_CONFIG,
+    PARTIAL_RESPONSE,
     PING,
     PONG,
+    PROMETHEUS_METRICS,
+    REQUEST_TYPES,
+    SIGN_BLOCK_RANGE,
     SIGN_EVENT,
+    SIGN_EVENTS,
     SUCCESS_RESPONSE,
+    TOO_MANY_ARGUMENTS,
     UNINITIALIZED,
+    VSockConnection,
     VSockRequest,
     VSockResponse,
-    dict_to_vsock_message,
-    vsock_message_to_dict,
 )
+from ..metrics import REGISTRY
+from ..utils import format_tx_id, format_url
+from .attestation import SUCCESS_PREFIX, AttestationHelper
+from .cache import SignedEventCache
+from .presign import EosPresigner
 
 
-ATTESTATION_EXEC = "./attestation"
-SUCCESS_PREFIX = "Success:"
 VERSION = b"\x01"
+MAX_BATCH_SIZE = 1000
+MAX_BLOCK_RANGE = 100000
+MAX_CONNECTION_REQUESTS = 256
+
+
+REQUESTS = REGISTRY.counter(
+    "attestator_requests_total",
+    "Requests handled, by type and response type",
+    ("type", "outcome"),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "attestator_request_seconds", "Latency of the requests handled", ("type",)
+)
+# Label of the requests of unknown type
+UNKNOWN_REQUEST_TYPE = "unknown"
 
 
 logger = logging.getLogger(__name__)
@@ -37,34 +75,232 @@ logger = logging.getLogger(__name__)
 class AttestatorServer:
     """AttestatorServer class."""
 
-    def __init__(self, state, config=None, cert=None):
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(
+        self,
+        state,
+        config=None,
+        cert=None,
+        *,
+        cache=None,
+        signing_workers=None,
+        presigners=None,
+    ):
         self.state = state
         self.config = config
         self.cert = cert
+        self.cache = SignedEventCache() if cache is None else cache
+        self.signing_workers = signing_workers
+        # Maps chains to their pre-signers, if enabled
+        self.presigners = {} if presigners is None else presigners
+        # Pre-signers share the flights of requests, rather than signing on their own
+        for chain, presigner in self.presigners.items():
+            presigner.sign = functools.partial(self.sign_shared, chain)
+
+        # Maps the transactions being signed to the futures resolving to their signed events
+        self.in_flight = {}
+        self.flights = set()
+        self.attestation = None
+
+        # Maps request types to the coroutine functions handling them, called with the request and
+        # the `send` coroutine function, which streamed requests send partial responses through
+        self.handlers = {
+            GET_ATTESTATION: lambda request, _: self.get_attestation(request),
+            METRICS: lambda request, _: self.get_metrics(request),
+            PING: lambda request, _: self.ping(request),
+            SIGN_BLOCK_RANGE: self.sign_block_range,
+            SIGN_EVENT: lambda request, _: self.sign_events(request),
+            SIGN_EVENTS: lambda request, _: self.sign_events_batch(request),
+        }
+
+        self.register_metrics()
 
     @classmethod
     def from_config_toml(cls, config, cert=None):
         """Build an AttestatorServer with the given configuration and optional `cert` file."""
         config_toml = toml.load(config)
 
-        state = {}
+        state, presigners = {}, {}
         for chain, chain_config in config_toml["networks"].items():
-            state[chain] = create_chain_state_from_config(chain, chain_config)
+            state[chain] = create_chain_state_from_config(chain, chain_config, cert)
+            if (presign_config := chain_config.get("presign")) is not None:
+                presigners[chain] = EosPresigner.from_config(
+                    chain, state[chain], VERSION, presign_config
+                )
+
+        cache = SignedEventCache.from_config(config_toml.get("cache", {}))
+        signing_workers = config_toml.get("signing", {}).get("workers")
+
+        return cls(
+            state,
+            config,
+            cert,
+            cache=cache,
+            signing_workers=signing_workers,
+            presigners=presigners,
+        )
+
+    def register_metrics(self):
+        """Register the metrics read from the server state into the registry.
 
-        return cls(state, config, cert)
+        Labelled by chain and endpoint for endpoints, by chain for pre-signers."""
+        endpoints = [
+            (chain, endpoint)
+            for chain, chain_state in self.state.items()
+            for endpoint in chain_state.endpoints
+        ]
 
-    def get_attestation(self):
-        """Return NSM-backed attestation, including the event signing key and the configuration."""
+        def single(value):
+            return lambda: {(): value()}
+
+        def by_endpoint(value):
+            return lambda: {(c, format_url(e.url)): value(e) for c, e in endpoints}
+
+        def by_presigner(value):
+            return lambda: {c: value(p) for c, p in self.presigners.items()}
+
+        REGISTRY.gauge(
+            "attestator_signings_in_flight",
+            "Transactions being signed",
+            function=single(lambda: len(self.in_flight)),
+        )
+        REGISTRY.gauge(
+            "attestator_cache_entries",
+            "Signed events cache entries",
+            function=single(lambda: len(self.cache.entries)),
+        )
+        REGISTRY.gauge(
+            "attestator_cache_size_bytes",
+            "Signed events cache estimated size",
+            function=single(lambda: self.cache.size),
+        )
+        for name in ("hits", "misses", "evictions"):
+            REGISTRY.counter(
+                f"attestator_cache_{name}_total",
+                f"Signed events cache {name}",
+                function=single(lambda name=name: getattr(self.cache, name)),
+            )
+
+        endpoint_labels = ("chain", "endpoint")
+        REGISTRY.gauge(
+            "attestator_endpoint_ejected",
+            "Whether the endpoint circuit is open or half-open",
+            endpoint_labels,
+            function=by_endpoint(lambda e: int(e.circuit != CLOSED)),
+        )
+        REGISTRY.gauge(
+            "attestator_endpoint_error_rate",
+            "Endpoint rolling error rate",
+            endpoint_labels,
+            function=by_endpoint(lambda e: e.error_rate),
+        )
+        REGISTRY.gauge(
+            "attestator_endpoint_latency_seconds",
+            "Endpoint rolling latency",
+            endpoint_labels,
+            function=by_endpoint(lambda e: e.latency or 0.0),
+        )
+        REGISTRY.gauge(
+            "attestator_endpoint_queued",
+            "Requests waiting for the endpoint limiter budget",
+            endpoint_labels,
+            function=by_endpoint(lambda e: e.limiter.waiting),
+        )
+        REGISTRY.counter(
+            "attestator_endpoint_queued_total",
+            "Requests which had to wait for the endpoint limiter budget",
+            endpoint_labels,
+            function=by_endpoint(lambda e: e.limiter.queued),
+        )
+
+        REGISTRY.counter(
+            "attestator_presigner_polls_total",
+            "Pre-signer polls",
+            ("chain",),
+            function=by_presigner(lambda p: p.polls),
+        )
+        REGISTRY.counter(
+            "attestator_presigned_total",
+            "Transactions pre-signed",
+            ("chain",),
+            function=by_presigner(lambda p: p.presigned),
+        )
+        REGISTRY.counter(
+            "attestator_presign_failures_total",
+            "Transactions which failed to be pre-signed",
+            ("chain",),
+            function=by_presigner(lambda p: p.failed),
+        )
+
+        REGISTRY.counter(
+            "process_cpu_seconds_total",
+            "Server process CPU time, signing workers excluded",
+            function=single(time.process_time),
+        )
+        REGISTRY.gauge(
+            "process_max_resident_memory_bytes",
+            "Server process peak resident memory",
+            # Reported in KiB on Linux
+            function=single(
+                lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            ),
+        )
+
+    def start(self):
+        """Start the signing engine workers and the pre-signers.
+
+        Better called before the server starts accepting connections, from the event loop."""
+        if ChainState.PK is not None and ChainState.SIGNING_ENGINE is None:
+            ChainState.SIGNING_ENGINE = SigningEngine(
+                ChainState.PK, self.signing_workers
+            )
+            ChainState.SIGNING_ENGINE.start()
+        for presigner in self.presigners.values():
+            presigner.start()
+
+    async def close(self):
+        """Release the pre-signers, chain states, signing engine and attestation resources."""
+        for presigner in self.presigners.values():
+            await presigner.close()
+        for flight in self.flights:
+            flight.cancel()
+        for chain_state in self.state.values():
+            await chain_state.close()
+        if ChainState.SIGNING_ENGINE is not None:
+            ChainState.SIGNING_ENGINE.close()
+            ChainState.SIGNING_ENGINE = None
+        if self.attestation is not None:
+            await self.attestation.close()
+
+    async def get_attestation(self, request):
+        """Return NSM-backed attestation, including the event signing key and the configuration.
+
+        An optional hex-encoded nonce can be passed as argument, to be included in the attestation
+        document."""
         if self.config is None:
             return VSockResponse(response_type=ERROR_RESPONSE, response=[NO_CONFIG])
         if ChainState.PK is None:
             return VSockResponse(response_type=ERROR_RESPONSE, response=[UNINITIALIZED])
 
-        # The attestation binary expects user data, nonce and public key arguments. I'm reading the
-        # configuration directly from its file to avoid handling escapes
-        attestation_out = os.popen(
-            f'{ATTESTATION_EXEC} "$(cat {self.config})" "" {pk_to_pub(ChainState.PK)}'
-        ).read()
+        if len(request.args) > 1:
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[TOO_MANY_ARGUMENTS, 1]
+            )
+        nonce = request.args[0] if request.args else ""
+        try:
+            nonce = nonce.removeprefix("0x")
+            bytes.fromhex(nonce)
+        except (AttributeError, ValueError):
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[INVALID_ARGUMENTS, nonce]
+            )
+
+        # The configuration and public key are passed once, when the helper is started
+        if self.attestation is None:
+            self.attestation = AttestationHelper.from_config_file(
+                self.config, pk_to_pub(ChainState.PK)
+            )
+        attestation_out = await self.attestation.attest(nonce.lower())
 
         if (success := attestation_out.removeprefix(SUCCESS_PREFIX)) != attestation_out:
             return VSockResponse(
@@ -77,6 +313,145 @@ class AttestatorServer:
             )
         return VSockResponse(response_type=ERROR_RESPONSE, response=[attestation_out])
 
+    @staticmethod
+    async def ping(_request):
+        """Return the response to a ping."""
+        return VSockResponse(response_type=SUCCESS_RESPONSE, response=[PONG])
+
+    @staticmethod
+    async def get_metrics(request):
+        """Return the server metrics, in the Prometheus text format, or as json if requested."""
+        if len(request.args) > 1:
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[TOO_MANY_ARGUMENTS, 1]
+            )
+
+        metrics_format = request.args[0] if request.args else PROMETHEUS_METRICS
+        if metrics_format == PROMETHEUS_METRICS:
+            return VSockResponse(
+                response_type=SUCCESS_RESPONSE, response=[REGISTRY.render()]
+            )
+        if metrics_format == JSON_METRICS:
+            return VSockResponse(
+                response_type=SUCCESS_RESPONSE, response=[REGISTRY.snapshot()]
+            )
+        return VSockResponse(
+            response_type=ERROR_RESPONSE, response=[INVALID_ARGUMENTS, metrics_format]
+        )
+
+    def single_flight(self, chain, tx_ids, aw, cache=None):
+        """Sign `tx_ids` on `chain` through the `aw` awaitable, in its own task.
+
+        `aw` returns, for each of `tx_ids`, either its signed events or a `ChainException`. Until
+        done, the transactions are registered as in flight, with a future each resolving to that
+        result, so that concurrent requests for the same transactions share them rather than
+        signing them again. Successfully signed transactions are cached in `cache`, the server
+        cache by default, those without events only briefly. Transactions without consensus result
+        in a `ChainException`, never cached.
+
+        Waiters leaving don't cancel the flight, and if the flight is cancelled, its waiters get a
+        `ChainException` rather than being cancelled themselves. Unexpected exceptions, raised by
+        `aw` or returned for some transactions, are logged and only fail those transactions, with
+        a `ChainException` too."""
+        cache = self.cache if cache is None else cache
+        loop = asyncio.get_running_loop()
+        keys = [(chain, tx_id, VERSION) for tx_id in tx_ids]
+        futures = [loop.create_future() for _ in keys]
+        self.in_flight.update(zip(keys, futures))
+
+        async def flight():
+            try:
+                results = await aw
+            except asyncio.CancelledError as exc:
+                results = [exc] * len(keys)
+            except BaseException as exc:  # pylint: disable=broad-exception-caught
+                logger.exception(
+                    "Signing %d transactions on %s got exception %s",
+                    len(keys),
+                    chain,
+                    exc,
+                )
+                results = [
+                    ChainException(f"Signing {format_tx_id(tx_id)} failed")
+                    for tx_id in tx_ids
+                ]
+
+            for key, future, result in zip(keys, futures, results):
+                del self.in_flight[key]
+                if isinstance(result, asyncio.CancelledError):
+                    # The waiters themselves weren't cancelled, they get an error response
+                    result = ChainException(f"Signing {format_tx_id(key[1])} cancelled")
+                elif isinstance(result, BaseException) and not isinstance(
+                    result, ChainException
+                ):
+                    logger.error(
+                        "Signing %s got exception %s",
+                        format_tx_id(key[1]),
+                        result,
+                        exc_info=result,
+                    )
+                    result = ChainException(f"Signing {format_tx_id(key[1])} failed")
+                elif not isinstance(result, ChainException):
+                    cache.put(key, result)
+                future.set_result(result)
+
+        # Flights outlive the request that started them, if cancelled
+        task = asyncio.create_task(flight())
+        self.flights.add(task)
+        task.add_done_callback(self.flights.discard)
+
+    async def sign_shared(self, chain, tx_ids, cache=None):
+        """Return the signed events or `ChainException` of each of `tx_ids` on `chain`, in order.
+
+        Cached transactions are served from the cache, those in flight share their flight, and the
+        others are signed in a single flight. Successfully signed transactions all end up cached in
+        `cache`, the server cache by default."""
+        keys = [(chain, tx_id, VERSION) for tx_id in tx_ids]
+        results = {}
+        for key in keys:
+            if (signed_events := self.cached(key)) is not None:
+                results[key] = signed_events
+        if new_tx_ids := [
+            k[1] for k in keys if k not in results and k not in self.in_flight
+        ]:
+            self.single_flight(
+                chain,
+                new_tx_ids,
+                sign_events_batch(new_tx_ids, chain, self.state[chain], VERSION),
+                cache,
+            )
+
+        flights = {k: self.in_flight[k] for k in keys if k not in results}
+        signed_events = await asyncio.gather(
+            *(asyncio.shield(future) for future in flights.values())
+        )
+        results.update(zip(flights, signed_events))
+
+        if cache is not None:
+            for key, result in results.items():
+                if not isinstance(result, ChainException) and key not in cache:
+                    cache.put(key, result)
+        return [results[key] for key in keys]
+
+    def cached(self, key):
+        """Return the signed events for the `(chain, tx_id, version)` key, if cached or pre-signed.
+
+        Return `None` otherwise."""
+        if (signed_events := self.cache.get(key)) is not None:
+            return signed_events
+        if (presigner := self.presigners.get(key[0])) is not None:
+            return presigner.get(key[1])
+        return None
+
+    @staticmethod
+    def signed_events_response(signed_events):
+        """Return the response for `signed_events`, either signed events or a `ChainException`."""
+        if isinstance(signed_events, ChainException):
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[str(signed_events)]
+            )
+        return VSockResponse(response_type=SUCCESS_RESPONSE, response=signed_events)
+
     async def sign_events(self, request):
         """Sign appropriate events with the corresponding chain state information."""
         try:
@@ -91,31 +466,225 @@ class AttestatorServer:
                 response_type=ERROR_RESPONSE, response=[UNINITIALIZED, chain]
             )
 
-        try:
-            signed_events = await sign_events(
-                args, chain, chain_state, VERSION, self.cert
+        if len(args) != 1 or not isinstance(tx_id := args[0], str):
+            # Invalid arguments, let the chain report the error
+            return self.signed_events_response(
+                await capture_chain_exception(
+                    sign_events(args, chain, chain_state, VERSION)
+                )
             )
+
+        # Signatures are deterministic, signed events can be served from the cache
+        key = (chain, tx_id, VERSION)
+        if (signed_events := self.cached(key)) is not None:
+            return VSockResponse(response_type=SUCCESS_RESPONSE, response=signed_events)
+
+        if key not in self.in_flight:
+            self.single_flight(
+                chain,
+                [tx_id],
+                asyncio.gather(
+                    capture_chain_exception(
+                        sign_events(args, chain, chain_state, VERSION)
+                    )
+                ),
+            )
+        return self.signed_events_response(await asyncio.shield(self.in_flight[key]))
+
+    async def sign_events_batch(self, request):
+        """Sign appropriate events for each `[chain, tx_id]` pair in the request.
+
+        Return a single response, with an inner response for each pair, in order."""
+        if not request.args:
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[NOT_ENOUGH_ARGUMENTS]
+            )
+        if len(request.args) > MAX_BATCH_SIZE:
+            return VSockResponse(
+                response_type=ERROR_RESPONSE,
+                response=[TOO_MANY_ARGUMENTS, MAX_BATCH_SIZE],
+            )
+
+        responses = [None] * len(request.args)
+        # Maps the index of each pair to sign to its in flight key
+        keys = {}
+        # Maps each chain to the transactions not in flight yet, signed chain by chain, without
+        # duplicates
+        chain_txs = {}
+        for idx, item in enumerate(request.args):
+            if (
+                not isinstance(item, list)
+                or len(item) != 2
+                or not all(isinstance(e, str) for e in item)
+            ):
+                responses[idx] = VSockResponse(
+                    response_type=ERROR_RESPONSE, response=[INVALID_ARGUMENTS, item]
+                )
+            elif (chain := item[0]) not in self.state:
+                responses[idx] = VSockResponse(
+                    response_type=ERROR_RESPONSE, response=[UNINITIALIZED, chain]
+                )
+            elif (signed_events := self.cached(key := (*item, VERSION))) is not None:
+                responses[idx] = VSockResponse(
+                    response_type=SUCCESS_RESPONSE, response=signed_events
+                )
+            else:
+                keys[idx] = key
+                if key not in self.in_flight:
+                    chain_txs.setdefault(chain, {})[item[1]] = None
+
+        for chain, txs in chain_txs.items():
+            self.single_flight(
+                chain,
+                list(txs),
+                sign_events_batch(list(txs), chain, self.state[chain], VERSION),
+            )
+
+        signed_events = await asyncio.gather(
+            *(asyncio.shield(self.in_flight[key]) for key in keys.values())
+        )
+        for idx, tx_signed_events in zip(keys, signed_events):
+            responses[idx] = self.signed_events_response(tx_signed_events)
+
+        return VSockResponse(
+            response_type=SUCCESS_RESPONSE, response=[r.as_dict() for r in responses]
+        )
+
+    async def sign_block_range(self, request, send):
+        """Sign appropriate events between the `from_block` and `to_block` blocks, included.
+
+        Signed events are streamed chunk by chunk, in order, through the `send` coroutine function,
+        as partial `[chunk_from_block, chunk_to_block, signed_events]` responses. Return a final
+        `[from_block, to_block, signed_events_count]` response, or an error response with the first
+        block not signed."""
+        if len(request.args) < 3:
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[NOT_ENOUGH_ARGUMENTS]
+            )
+        if len(request.args) > 3:
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[TOO_MANY_ARGUMENTS, 3]
+            )
+
+        chain, from_block, to_block = request.args
+        if (chain_state := self.state.get(chain)) is None:
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[UNINITIALIZED, chain]
+            )
+        if (
+            not all(
+                isinstance(b, int) and not isinstance(b, bool)
+                for b in (from_block, to_block)
+            )
+            or not 0 <= from_block <= to_block
+            or to_block - from_block >= MAX_BLOCK_RANGE
+        ):
+            return VSockResponse(
+                response_type=ERROR_RESPONSE,
+                response=[INVALID_ARGUMENTS, from_block, to_block],
+            )
+
+        next_block, signed_events_count = from_block, 0
+        try:
+            # Chunks signed ahead are cancelled as soon as the stream stops, e.g. on disconnection
+            async with contextlib.aclosing(
+                sign_block_range(from_block, to_block, chain, chain_state, VERSION)
+            ) as chunks:
+                async for chunk_from, chunk_to, signed_events in chunks:
+                    await send(
+                        VSockResponse(
+                            response_type=PARTIAL_RESPONSE,
+                            response=[chunk_from, chunk_to, signed_events],
+                        )
+                    )
+                    next_block = chunk_to + 1
+                    signed_events_count += len(signed_events)
         except ChainException as exc:
-            return VSockResponse(response_type=ERROR_RESPONSE, response=[str(exc)])
-        return VSockResponse(response_type=SUCCESS_RESPONSE, response=signed_events)
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[str(exc), next_block]
+            )
+
+        return VSockResponse(
+            response_type=SUCCESS_RESPONSE,
+            response=[from_block, to_block, signed_events_count],
+        )
+
+    async def dispatch(self, request, send):
+        """Return the response to `request`.
+
+        Partial responses to streamed requests are sent through the `send` coroutine function."""
+        if (handler := self.handlers.get(request.request_type)) is None:
+            return VSockResponse(
+                response_type=ERROR_RESPONSE, response=[INVALID_REQUEST_TYPE]
+            )
+        return await handler(request, send)
+
+    async def respond(self, request, connection, write_lock):
+        """Write the response to `request` through `connection`, tagged with the request id.
+
+        Partial responses, if any, are written first, as soon as they are ready. The request outcome
+        and latency are recorded in the metrics, by request type."""
+        request_type = request.request_type
+        if request_type not in REQUEST_TYPES:
+            request_type = UNKNOWN_REQUEST_TYPE
+        start = time.monotonic()
+
+        async def send(resp):
+            resp.request_id = request.request_id
+            resp = resp.as_dict()
+
+            async with write_lock:
+                connection.write(resp)
+                await connection.writer.drain()
+
+        try:
+            try:
+                resp = await self.dispatch(request, send)
+            except ConnectionError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.exception(
+                    "Request %s got exception %s", request.request_type, exc
+                )
+                resp = VSockResponse(
+                    response_type=ERROR_RESPONSE, response=[INTERNAL_ERROR]
+                )
+            REQUESTS.labels(request_type, resp.response_type).inc()
+            REQUEST_SECONDS.labels(request_type).observe(time.monotonic() - start)
+            await send(resp)
+        except ConnectionError as exc:
+            logger.info("Dropping response, connection lost: %s", exc)
 
     async def run(self, reader, writer):
-        """Run the server once a stream as been established."""
+        """Run the server once a stream as been established.
+
+        Each request is handled in its own task, responses are written as soon as they are ready,
+        possibly out of order."""
         address, port = writer.get_extra_info("socket").getsockname()
         logger.info("Server started on %s:%d", address, port)
-        async for msg in reader:
-            request = VSockRequest.from_json(vsock_message_to_dict(msg))
-            if request.request_type == GET_ATTESTATION:
-                resp = self.get_attestation()
-            elif request.request_type == PING:
-                resp = VSockResponse(response_type=SUCCESS_RESPONSE, response=[PONG])
-            elif request.request_type == SIGN_EVENT:
-                resp = await self.sign_events(request)
-            else:
-                resp = VSockResponse(
-                    response_type=ERROR_RESPONSE, response=[INVALID_REQUEST_TYPE]
+
+        connection = await VSockConnection.accept(reader, writer)
+        logger.debug("Using %s framing", connection.framing)
+
+        write_lock = asyncio.Lock()
+        # Bounds the requests in flight, stop reading from the connection once reached
+        requests_semaphore = asyncio.Semaphore(MAX_CONNECTION_REQUESTS)
+        tasks = set()
+        try:
+            async for msg in connection:
+                request = VSockRequest.from_json(msg)
+
+                await requests_semaphore.acquire()
+                task = asyncio.create_task(
+                    self.respond(request, connection, write_lock)
                 )
-            resp = resp.as_dict()
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: requests_semaphore.release())
 
-            writer.writelines([dict_to_vsock_message(resp)])
-            await writer.drain()
+            # The client is done sending requests, wait for the pending responses
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
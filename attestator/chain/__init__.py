@@ -1,6 +1,8 @@
 """Interaction with blockchain endpoints and data."""
 
-from ..crypto import generate_pk
+from ..crypto import SigningEngine, generate_pk, pk_to_pub
+from .preimage import PreimageEncoder
+from .session import create_session
 
 
 class ChainException(Exception):
@@ -11,6 +13,10 @@ class RpcException(Exception):
     """ChainException class."""
 
 
+class RpcNotFoundException(RpcException):
+    """RpcNotFoundException class."""
+
+
 EVM = "evm"
 EOS = "eos"
 
@@ -37,11 +43,71 @@ CHAIN_PROTOCOL = {EVM: b"\x01", EOS: b"\x02"}
 
 
 class ChainState:
-    """ChainState class."""
+    """ChainState class.
+
+    Holds what every protocol state shares: the `chain` name, its `endpoints` and their consensus
+    `threshold`, the optional `cert` file and the `max_response_size` of responses. The pooled
+    session and the preimage encoders are created on first use."""
 
     PK = None
+    SIGNING_ENGINE = None
 
     def __new__(cls, *_, **__):
         if ChainState.PK is None:
             ChainState.PK = generate_pk()
         return super().__new__(cls)
+
+    def __init__(self, chain, threshold, endpoints, cert, max_response_size):
+        self.chain = chain
+        self.threshold = threshold
+        self.endpoints = endpoints
+        self.cert = cert
+        self.max_response_size = max_response_size
+
+        self._session = None
+        self._preimage_encoders = {}
+
+    @property
+    def signing_engine(self):
+        """Return the signing engine shared by every state, creating it on first use."""
+        if ChainState.SIGNING_ENGINE is None:
+            ChainState.SIGNING_ENGINE = SigningEngine(ChainState.PK)
+        return ChainState.SIGNING_ENGINE
+
+    def preimage_encoder(self, version, protocol, exception):
+        """Return the preimage encoder for `version` and `protocol`, creating it on first use."""
+        if (encoder := self._preimage_encoders.get(version)) is None:
+            encoder = self._preimage_encoders[version] = PreimageEncoder(
+                version,
+                protocol,
+                CHAIN[self.chain]["id"],
+                pk_to_pub(ChainState.PK),
+                exception,
+            )
+        return encoder
+
+    def select_endpoints(self):
+        """Return the endpoints to query, healthiest first.
+
+        Ejected endpoints are skipped, unless needed to reach the consensus threshold."""
+        selected, ejected = [], []
+        for endpoint in sorted(self.endpoints, key=lambda e: e.health()):
+            (selected if endpoint.acquire() else ejected).append(endpoint)
+
+        return selected + ejected[: max(self.threshold - len(selected), 0)]
+
+    @property
+    def session(self):
+        """Return the pooled aiohttp session for this state, creating it on first use.
+
+        The session is shared by every request to the state endpoints, and is only valid within the
+        event loop it was first requested from."""
+        if self._session is None or self._session.closed:
+            self._session = create_session(self.cert)
+        return self._session
+
+    async def close(self):
+        """Close the pooled aiohttp session, if any."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -1,18 +1,57 @@
 """Core chain functionality."""
 
 import asyncio
+import collections
+import functools
+import time
 
+from ..metrics import REGISTRY
 from . import CHAIN, EOS, EVM, ChainException
+from .endpoint import Endpoint
 from .eos import EosChainException
+from .eos.chain import EosTransaction
 from .eos.state import EosState
 from .eos.rpc import get_eos_transaction
 from .evm import EvmChainException
+from .evm.chain import EvmLog, EvmTransactionReceipt
 from .evm.state import EvmState
-from .evm.rpc import get_evm_transaction
+from .evm.rpc import (
+    DEFAULT_GET_LOGS_BLOCK_RANGE,
+    get_evm_logs,
+    get_evm_transaction,
+    get_evm_transactions,
+)
+from .session import DEFAULT_MAX_RESPONSE_SIZE
 
 
-def create_chain_state_from_config(chain, config):
-    """Return a ChainState instance from the given configuration."""
+# Block range chunks fetched and signed ahead of the one being streamed
+MAX_CHUNKS_IN_FLIGHT = 4
+
+SUCCESS = "success"
+FAILURE = "failure"
+
+SIGNINGS = REGISTRY.counter(
+    "attestator_signings_total",
+    "Transactions and block range chunks signed, by outcome",
+    ("chain", "outcome"),
+)
+SIGNING_SECONDS = REGISTRY.histogram(
+    "attestator_signing_seconds",
+    "Latency of signing transactions and block range chunks, fetching included",
+    ("chain",),
+)
+SIGNED_EVENTS = REGISTRY.counter(
+    "attestator_signed_events_total", "Events signed", ("chain",)
+)
+CONSENSUS_FAILURES = REGISTRY.counter(
+    "attestator_consensus_failures_total",
+    "Transactions and block range chunks without consensus among endpoints",
+    ("chain",),
+)
+
+
+def create_chain_state_from_config(chain, config, cert=None):
+    """Return a ChainState instance from the given configuration and optional `cert` file."""
     chain = chain.lower()
     if chain not in CHAIN:
         raise ChainException(f"Chain {chain} not supported")
@@ -20,14 +59,18 @@ def create_chain_state_from_config(chain, config):
     protocol = CHAIN[chain]["protocol"]
     if protocol in (EVM, EOS):
         threshold = config["consensus_threshold"]
-        endpoints = config["endpoints"]
+        health, limits = config.get("health", {}), config.get("limits", {})
+        endpoints = [
+            Endpoint.from_config(url, health, limits, chain)
+            for url in config["endpoints"]
+        ]
         if len(endpoints) // 2 + 1 > threshold:
             raise ChainException(
                 f"Consensus threshold too small: threshold {threshold}, endpoints {len(endpoints)}"
             )
 
         for event in config["events"]:
-            if len(event) != 2 and not all((isinstance(e, str) for e in event)):
+            if len(event) != 2 or not all((isinstance(e, str) for e in event)):
                 if protocol == EVM:
                     evt_fmt = "(address, eventTopic)"
                 else:  # if protocol == EOS
@@ -37,35 +80,157 @@ def create_chain_state_from_config(chain, config):
                     "tuple of strings: " + evt_fmt
                 )
 
+        max_response_size = config.get("max_response_size", DEFAULT_MAX_RESPONSE_SIZE)
+
+        # Events are compiled once into indexes, shared by filtering and signing
         if protocol == EVM:
-            return EvmState(chain, config["events"], threshold, endpoints)
+            event_index = EvmState.compile_events(config["events"])
+            return EvmState(
+                chain,
+                event_index,
+                threshold,
+                endpoints,
+                cert=cert,
+                max_response_size=max_response_size,
+                get_logs_block_range=config.get(
+                    "get_logs_block_range", DEFAULT_GET_LOGS_BLOCK_RANGE
+                ),
+            )
         # elif protocol == EOS
-        return EosState(chain, config["events"], threshold, endpoints)
+        event_index = EosState.compile_events(config["events"])
+        return EosState(
+            chain,
+            event_index,
+            threshold,
+            endpoints,
+            cert=cert,
+            max_response_size=max_response_size,
+        )
     raise ChainException(f"Protocol {protocol} not supported")
 
 
-def find_consensus_element(data, threshold):
-    """Return an element from `data` if at least `threshold` elements match it.
-
-    `threshold` needs to be at least `len(data) // 2 + 1` to make sense."""
-    # If no consensus element is found in the first half + 1 of the data, none will be
-    # I'm checking half **plus one** to cover for odd `data` lengths
-    cutoff = len(data) // 2 + 1
-    consensus = None
-    for idx, e in enumerate(data[:cutoff]):
-        counter = 1
-        # Checking forward only, no point in checking prior elements, since I already did
-        for ee in data[idx + 1 :]:
-            # This works by overloading `==` with `__eq__`
-            if e == ee:
-                counter += 1
-        if counter >= threshold:
-            consensus = e
-            break
-    return consensus
-
-
-async def sign_events(events, chain, state, version, cert=None):
+async def find_consensus(aws, threshold, key=None):
+    """Return the first result shared by at least `threshold` of the `aws` awaitables.
+
+    Results are compared through their hashable `key`, if provided, or directly otherwise, as soon
+    as each awaitable completes. Pending awaitables are cancelled once consensus is reached, or once
+    it can't be reached anymore since too many awaitables either failed or disagreed. Return the
+    consensus result, `None` if none is found, together with the exceptions raised so far."""
+    pending = {asyncio.ensure_future(aw) for aw in aws}
+    # Maps each distinct result key to its first result and its counter
+    candidates = {}
+    exceptions = []
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if (exc := task.exception()) is not None:
+                    exceptions.append(exc)
+                    continue
+
+                result = task.result()
+                try:
+                    result_key = result if key is None else key(result)
+                except Exception as exc:  # pylint: disable=broad-exception-caught
+                    # A malformed result counts as a failure of its awaitable
+                    exceptions.append(exc)
+                    continue
+
+                candidate = candidates.setdefault(result_key, [result, 0])
+                candidate[1] += 1
+                if candidate[1] >= threshold:
+                    return candidate[0], exceptions
+
+            # Even if every pending awaitable agreed with the best candidate, there would be no
+            # consensus
+            best = max((counter for _, counter in candidates.values()), default=0)
+            if best + len(pending) < threshold:
+                break
+        return None, exceptions
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def tracked(sign):
+    """Wrap the `sign(aws, state, version)` coroutine function to record its calls in the metrics.
+
+    Outcomes, latencies and signed events are recorded by chain."""
+
+    @functools.wraps(sign)
+    async def wrapper(aws, state, version):
+        start = time.monotonic()
+        try:
+            signed_events = await sign(aws, state, version)
+        except ChainException:
+            SIGNINGS.labels(state.chain, FAILURE).inc()
+            SIGNING_SECONDS.labels(state.chain).observe(time.monotonic() - start)
+            raise
+
+        SIGNINGS.labels(state.chain, SUCCESS).inc()
+        SIGNING_SECONDS.labels(state.chain).observe(time.monotonic() - start)
+        SIGNED_EVENTS.labels(state.chain).inc(len(signed_events))
+        return signed_events
+
+    return wrapper
+
+
+@tracked
+async def sign_evm_transaction(aws, state, version):
+    """Sign the filtered logs of the consensus receipt among the `aws` awaitables."""
+    consensus, exceptions = await find_consensus(
+        aws, state.threshold, key=EvmTransactionReceipt.digest
+    )
+
+    if consensus is None:
+        CONSENSUS_FAILURES.labels(state.chain).inc()
+        txs_str = ", ".join(map(str, exceptions))
+        raise EvmChainException(f"No consensus found, endpoint returns: {txs_str}")
+
+    # Only the consensus json is parsed
+    receipt = EvmTransactionReceipt.from_json(consensus)
+    filtered_logs = state.filter_transaction(receipt)
+
+    return await state.sign_logs(filtered_logs, version)
+
+
+@tracked
+async def sign_evm_logs(aws, state, version):
+    """Sign the filtered logs of the consensus logs list among the `aws` awaitables."""
+    consensus, exceptions = await find_consensus(
+        aws, state.threshold, key=EvmLog.digest_logs
+    )
+
+    if consensus is None:
+        CONSENSUS_FAILURES.labels(state.chain).inc()
+        logs_str = ", ".join(map(str, exceptions))
+        raise EvmChainException(f"No consensus found, endpoint returns: {logs_str}")
+
+    return await state.sign_logs(state.filter_logs(consensus), version)
+
+
+@tracked
+async def sign_eos_transaction(aws, state, version):
+    """Sign the filtered actions of the consensus transaction among the `aws` awaitables."""
+    consensus, exceptions = await find_consensus(
+        aws, state.threshold, key=EosTransaction.digest
+    )
+
+    if consensus is None:
+        CONSENSUS_FAILURES.labels(state.chain).inc()
+        txs_str = ", ".join(map(str, exceptions))
+        raise EosChainException(f"No consensus found, endpoint returns: {txs_str}")
+
+    # Only the consensus json is parsed
+    transaction = EosTransaction.from_json(consensus)
+    filtered_actions = state.filter_transaction(transaction)
+
+    return await state.sign_actions(filtered_actions, version)
+
+
+async def sign_events(events, chain, state, version):
     """Sign `events` on `chain` with the given chain `state`."""
     protocol = CHAIN[chain]["protocol"]
 
@@ -77,22 +242,21 @@ async def sign_events(events, chain, state, version, cert=None):
                 f"Invalid event details: expected `[transaction_id]`, received {events}"
             ) from None
 
-        txs = await asyncio.gather(
-            *(get_evm_transaction(tx_id, rpc, cert=cert) for rpc in state.rpcs),
-            return_exceptions=True,
+        return await sign_evm_transaction(
+            (
+                endpoint.track(
+                    get_evm_transaction(
+                        tx_id,
+                        endpoint.url,
+                        session=state.session,
+                        max_size=state.max_response_size,
+                    )
+                )
+                for endpoint in state.select_endpoints()
+            ),
+            state,
+            version,
         )
-
-        filtered_txs = [tx for tx in txs if not isinstance(tx, Exception)]
-
-        if (consensus := find_consensus_element(filtered_txs, state.threshold)) is None:
-            txs_str = ", ".join(
-                map(str, filter(lambda tx: isinstance(tx, Exception), txs))
-            )
-            raise EvmChainException(f"No consensus found, endpoint returns: {txs_str}")
-
-        filtered_logs = state.filter_transaction(consensus)
-
-        return state.sign_logs(filtered_logs, version)
     if protocol == EOS:
         try:
             (tx_id,) = events
@@ -101,23 +265,145 @@ async def sign_events(events, chain, state, version, cert=None):
                 f"Invalid event details: expected `[transaction_id]`, received {events}"
             ) from None
 
-        txs = await asyncio.gather(
-            *(get_eos_transaction(tx_id, rpc, cert=cert) for rpc in state.rpcs),
-            return_exceptions=True,
+        return await sign_eos_transaction(
+            (
+                endpoint.track(
+                    get_eos_transaction(
+                        tx_id,
+                        endpoint.url,
+                        session=state.session,
+                        max_size=state.max_response_size,
+                    )
+                )
+                for endpoint in state.select_endpoints()
+            ),
+            state,
+            version,
         )
 
-        filtered_txs = [tx for tx in txs if not isinstance(tx, Exception)]
+    # This is here mostly for the linter, an initialized chain should not belong to an unsupported
+    # protocol
+    raise ChainException(f"Protocol {protocol} not supported")
+
 
-        if (consensus := find_consensus_element(filtered_txs, state.threshold)) is None:
-            txs_str = ", ".join(
-                map(str, filter(lambda tx: isinstance(tx, Exception), txs))
-            )
-            raise EosChainException(f"No consensus found, endpoint returns: {txs_str}")
+async def capture_chain_exception(aw):
+    """Return the result of the `aw` awaitable, or the `ChainException` it raised."""
+    try:
+        return await aw
+    except ChainException as exc:
+        return exc
+
+
+async def get_batch_item(batch, idx):
+    """Return the `idx`-th result of the `batch` task, raise it if it's an exception.
+
+    The `batch` task is shielded, since it's shared by every item in the batch."""
+    result = (await asyncio.shield(batch))[idx]
+    if isinstance(result, Exception):
+        raise result
+    return result
 
-        filtered_actions = state.filter_transaction(consensus)
 
-        return state.sign_actions(filtered_actions, version)
+async def sign_events_batch(tx_ids, chain, state, version):
+    """Sign the events of each of `tx_ids` on `chain` with the given chain `state`.
+
+    Return, for each of `tx_ids` and in order, either the signed events or the `ChainException`
+    raised while signing them. EVM transactions are fetched with JSON-RPC batch requests, each
+    tracked by its endpoint on its own."""
+    protocol = CHAIN[chain]["protocol"]
+
+    if protocol == EVM:
+        batches = [
+            asyncio.ensure_future(
+                get_evm_transactions(
+                    tx_ids,
+                    endpoint.url,
+                    session=state.session,
+                    max_size=state.max_response_size,
+                    track=endpoint.track,
+                )
+            )
+            for endpoint in state.select_endpoints()
+        ]
+        try:
+            return await asyncio.gather(
+                *(
+                    capture_chain_exception(
+                        sign_evm_transaction(
+                            [get_batch_item(batch, idx) for batch in batches],
+                            state,
+                            version,
+                        )
+                    )
+                    for idx in range(len(tx_ids))
+                )
+            )
+        finally:
+            # Batches from slow endpoints might still be pending after consensus is reached
+            for batch in batches:
+                batch.cancel()
+    if protocol == EOS:
+        return await asyncio.gather(
+            *(
+                capture_chain_exception(sign_events([tx_id], chain, state, version))
+                for tx_id in tx_ids
+            )
+        )
 
     # This is here mostly for the linter, an initialized chain should not belong to an unsupported
     # protocol
     raise ChainException(f"Protocol {protocol} not supported")
+
+
+async def sign_block_range(from_block, to_block, chain, state, version):
+    """Yield the signed events between `from_block` and `to_block`, included, on `chain`.
+
+    Blocks are split in chunks of the state `get_logs_block_range`, each fetched with a single
+    `eth_getLogs` request per endpoint, and signed once its endpoints reach consensus. Yield a
+    `(chunk_from_block, chunk_to_block, signed_events)` tuple per chunk, in order, while up to
+    `MAX_CHUNKS_IN_FLIGHT` chunks are fetched ahead. Raise the `ChainException` of the first chunk
+    failing."""
+    protocol = CHAIN[chain]["protocol"]
+    if protocol != EVM:
+        raise ChainException(f"Block range signing not supported for {protocol} chains")
+    if not state.event_index:
+        # An empty address filter would match every log
+        return
+
+    def sign_chunk(chunk_from, chunk_to):
+        return sign_evm_logs(
+            (
+                endpoint.track(
+                    get_evm_logs(
+                        chunk_from,
+                        chunk_to,
+                        state.event_index,
+                        endpoint.url,
+                        session=state.session,
+                        max_size=state.max_response_size,
+                    )
+                )
+                for endpoint in state.select_endpoints()
+            ),
+            state,
+            version,
+        )
+
+    size = state.get_logs_block_range
+    pending = collections.deque()
+    try:
+        for chunk_from in range(from_block, to_block + 1, size):
+            chunk = (chunk_from, min(chunk_from + size - 1, to_block))
+            pending.append((chunk, asyncio.ensure_future(sign_chunk(*chunk))))
+            if len(pending) <= MAX_CHUNKS_IN_FLIGHT:
+                continue
+
+            chunk, task = pending.popleft()
+            yield (*chunk, await task)
+
+        while pending:
+            chunk, task = pending.popleft()
+            yield (*chunk, await task)
+    finally:
+        for _, task in pending:
+            task.cancel()
@@ -0,0 +1,321 @@
+"""Endpoint health tracking and rate limiting."""
+
+import asyncio
+import logging
+import time
+
+from ..metrics import REGISTRY
+from ..utils import format_url
+from . import RpcException, RpcNotFoundException
+
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 30.0
+# Weight of the latest request in the rolling latency and error rate
+SMOOTHING = 0.2
+DEFAULT_MAX_QUEUED = 100
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Request outcomes, as recorded in the metrics
+SUCCESS = "success"
+FAILURE = "failure"
+NOT_FOUND = "not_found"
+TIMEOUT = "timeout"
+THROTTLED = "throttled"
+OUTCOMES = (SUCCESS, FAILURE, NOT_FOUND, TIMEOUT, THROTTLED)
+
+RPC_REQUESTS = REGISTRY.counter(
+    "attestator_rpc_requests_total",
+    "Requests to chain endpoints, by outcome",
+    ("chain", "endpoint", "outcome"),
+)
+RPC_REQUEST_SECONDS = REGISTRY.histogram(
+    "attestator_rpc_request_seconds",
+    "Latency of the requests to chain endpoints, time spent queued excluded",
+    ("chain", "endpoint"),
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_failure(exc):
+    """Return whether `exc` is due to the endpoint, rather than to the requested data."""
+    return not isinstance(exc, RpcNotFoundException)
+
+
+def close_unsent(aw):
+    """Close the `aw` awaitable of a request that is never sent, if it's a coroutine."""
+    if asyncio.iscoroutine(aw):
+        aw.close()
+
+
+def is_batch_failure(results):
+    """Return whether every item in a batch of `results` failed due to the endpoint."""
+    return all(isinstance(r, Exception) and is_failure(r) for r in results)
+
+
+class EndpointLimiter:
+    """EndpointLimiter class.
+
+    Caps the requests to an endpoint to `max_in_flight` at once and to `rps` per second, allowing
+    bursts of up to `rps` requests, when set. Requests over budget wait in line, up to `max_queued`
+    of them, further ones are throttled straight away."""
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, max_in_flight=None, rps=None, max_queued=DEFAULT_MAX_QUEUED):
+        self.max_in_flight = max_in_flight
+        self.rps = rps
+        self.max_queued = max_queued
+
+        self.semaphore = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        # Start with a full bucket, as refill caps it
+        self.tokens = float(max(rps, 1) if rps else 0)
+        self.refilled_at = time.monotonic()
+        self.waiting = 0
+
+        self.requests = 0
+        self.queued = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Build an EndpointLimiter from the optional chain `limits` configuration section."""
+        return cls(
+            max_in_flight=config.get("max_in_flight"),
+            rps=config.get("rps"),
+            max_queued=config.get("max_queued", DEFAULT_MAX_QUEUED),
+        )
+
+    def refill(self):
+        """Add the tokens earned since the last refill, up to a second worth of them."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.tokens + (now - self.refilled_at) * self.rps, max(self.rps, 1)
+        )
+        self.refilled_at = now
+
+    def ready(self):
+        """Return whether a request can be sent right away."""
+        if self.semaphore is not None and self.semaphore.locked():
+            return False
+        if self.rps:
+            self.refill()
+            return self.tokens >= 1
+        return True
+
+    async def take_token(self):
+        """Wait for a token to be available and take it."""
+        while True:
+            self.refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rps)
+
+    async def acquire(self, url):
+        """Wait for the budget to send a request to `url`, raise if too many are waiting."""
+        if self.waiting or not self.ready():
+            if self.waiting >= self.max_queued:
+                self.throttled += 1
+                raise RpcException(
+                    f"Request to {format_url(url)} throttled: {self.waiting} queued"
+                )
+            self.queued += 1
+
+        self.waiting += 1
+        try:
+            if self.semaphore is not None:
+                await self.semaphore.acquire()
+            if self.rps:
+                try:
+                    await self.take_token()
+                except BaseException:
+                    self.release()
+                    raise
+        finally:
+            self.waiting -= 1
+        self.requests += 1
+
+    def release(self):
+        """Release the in-flight slot of a completed request."""
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+
+class Endpoint:
+    """Endpoint class.
+
+    Keeps rolling latency and error rate statistics of the requests to the `url` endpoint, and a
+    circuit breaker. The circuit opens after `failure_threshold` consecutive failures, ejecting the
+    endpoint, and half-opens after `reset_timeout` seconds, letting a single probe request through:
+    the circuit closes again if it succeeds, and re-opens otherwise. Requests taking more than
+    `timeout` seconds fail. Requests are sent within the budget of the optional `limiter`. Request
+    outcomes and latencies are recorded in the metrics, labelled with its `chain`."""
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(
+        self,
+        url,
+        timeout=DEFAULT_TIMEOUT,
+        failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout=DEFAULT_RESET_TIMEOUT,
+        *,
+        limiter=None,
+        chain="",
+    ):
+        self.url = url
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.limiter = EndpointLimiter() if limiter is None else limiter
+
+        self.latency = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.circuit = CLOSED
+        self.opened_at = None
+        # Set while a probe request is in flight, until it completes
+        self.probe = None
+
+        # Samples looked up once, updated on every request
+        self.requests_metric = {
+            outcome: RPC_REQUESTS.labels(chain, format_url(url), outcome)
+            for outcome in OUTCOMES
+        }
+        self.latency_metric = RPC_REQUEST_SECONDS.labels(chain, format_url(url))
+
+    @classmethod
+    def from_config(cls, url, health_config, limits_config, chain=""):
+        """Build an Endpoint for `url` from the optional chain `health` and `limits` sections.
+
+        Each endpoint gets its own limiter, shared by every request to it."""
+        return cls(
+            url,
+            timeout=health_config.get("timeout", DEFAULT_TIMEOUT),
+            failure_threshold=health_config.get(
+                "failure_threshold", DEFAULT_FAILURE_THRESHOLD
+            ),
+            reset_timeout=health_config.get("reset_timeout", DEFAULT_RESET_TIMEOUT),
+            limiter=EndpointLimiter.from_config(limits_config),
+            chain=chain,
+        )
+
+    def health(self):
+        """Return a sort key for the endpoint, healthiest endpoints first."""
+        return (self.circuit != CLOSED, self.error_rate, self.latency or 0.0)
+
+    def acquire(self):
+        """Return whether a request can be sent to the endpoint, according to its circuit.
+
+        Half-open circuits only let a single probe request through at once, the probe starting once
+        the request is tracked."""
+        if self.circuit == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.circuit = HALF_OPEN
+            logger.info("Probing endpoint %s", format_url(self.url))
+
+        return self.circuit != HALF_OPEN or self.probe is None
+
+    def record_success(self, latency, outcome=SUCCESS):
+        """Update the endpoint statistics with a successful request."""
+        self.requests_metric[outcome].inc()
+        self.latency_metric.observe(latency)
+        self.latency = (
+            latency
+            if self.latency is None
+            else (1 - SMOOTHING) * self.latency + SMOOTHING * latency
+        )
+        self.error_rate *= 1 - SMOOTHING
+        self.consecutive_failures = 0
+
+        if self.circuit != CLOSED:
+            logger.info("Endpoint %s recovered", format_url(self.url))
+            self.circuit = CLOSED
+
+    def record_failure(self, latency, outcome=FAILURE):
+        """Update the endpoint statistics with a failed request, opening the circuit if needed."""
+        self.requests_metric[outcome].inc()
+        self.latency_metric.observe(latency)
+        self.error_rate = (1 - SMOOTHING) * self.error_rate + SMOOTHING
+        self.consecutive_failures += 1
+
+        if self.circuit == HALF_OPEN or (
+            self.circuit == CLOSED
+            and self.consecutive_failures >= self.failure_threshold
+        ):
+            logger.warning(
+                "Ejecting endpoint %s for %ss after %d failures",
+                format_url(self.url),
+                self.reset_timeout,
+                self.consecutive_failures,
+            )
+            self.circuit = OPEN
+            self.opened_at = time.monotonic()
+
+    async def track(self, aw, failed=None):
+        """Return the result of the `aw` awaitable, recording its outcome in the endpoint health.
+
+        Results for which the optional `failed` predicate holds are recorded as failures too.
+        Cancelled and throttled requests are not recorded in the endpoint health, neither is the
+        time spent queued. A half-open endpoint is probed by a single request at once, others wait
+        for the probe and raise `RpcException` if it re-opened the circuit."""
+        waited = False
+        while self.circuit == HALF_OPEN and self.probe is not None:
+            waited = True
+            try:
+                await self.probe.wait()
+            except BaseException:
+                close_unsent(aw)
+                raise
+        if waited and self.circuit == OPEN:
+            close_unsent(aw)
+            raise RpcException(f"Endpoint {format_url(self.url)} failed its probe")
+
+        # Set and cleared around the probe request, whatever becomes of it
+        if probe := self.circuit == HALF_OPEN:
+            self.probe = asyncio.Event()
+        try:
+            return await self.send(aw, failed)
+        finally:
+            if probe:
+                self.probe.set()
+                self.probe = None
+
+    async def send(self, aw, failed):
+        """Return the result of the `aw` awaitable, within the limiter budget, as `track` does."""
+        try:
+            await self.limiter.acquire(self.url)
+        except BaseException as exc:
+            if isinstance(exc, RpcException):
+                self.requests_metric[THROTTLED].inc()
+            close_unsent(aw)
+            raise
+
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(aw, self.timeout)
+        except asyncio.TimeoutError:
+            self.record_failure(time.monotonic() - start, TIMEOUT)
+            raise RpcException(
+                f"Request to {format_url(self.url)} timed out after {self.timeout}s"
+            ) from None
+        except Exception as exc:
+            if is_failure(exc):
+                self.record_failure(time.monotonic() - start)
+            else:
+                self.record_success(time.monotonic() - start, NOT_FOUND)
+            raise
+        finally:
+            self.limiter.release()
+
+        if failed is not None and failed(result):
+            self.record_failure(time.monotonic() - start)
+        else:
+            self.record_success(time.monotonic() - start)
+        return result
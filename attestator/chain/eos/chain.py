@@ -2,11 +2,16 @@
 
 from dataclasses import dataclass, field
 
-from ...utils import check_mismatched_fields
+from ...utils import (
+    canonical_digest,
+    check_mismatched_fields,
+    dataclass_to_excluded_field_set,
+    drop_fields,
+)
 from . import EosChainException
 
 
-@dataclass
+@dataclass(slots=True)
 class EosAuthorization:
     """EosAuthorization class."""
 
@@ -21,7 +26,7 @@ class EosAuthorization:
         return cls(**auth_json)
 
 
-@dataclass
+@dataclass(slots=True)
 class EosAct:
     """EosAct class."""
 
@@ -35,13 +40,14 @@ class EosAct:
         """Create EosAct from json."""
         check_mismatched_fields(act_json, cls, EosChainException)
 
+        act_json = act_json.copy()
         auths = act_json["authorization"]
         act_json["authorization"] = [EosAuthorization.from_json(a) for a in auths]
 
         return cls(**act_json)
 
 
-@dataclass
+@dataclass(slots=True)
 class EosAuth:
     """EosAuth class."""
 
@@ -56,7 +62,7 @@ class EosAuth:
         return cls(**auth_json)
 
 
-@dataclass
+@dataclass(slots=True)
 class EosReceipt:
     """EosReceipt class."""
 
@@ -70,13 +76,14 @@ class EosReceipt:
         """Create EosReceipt from json."""
         check_mismatched_fields(rcpt_json, cls, EosChainException)
 
+        rcpt_json = rcpt_json.copy()
         auths = rcpt_json["auth_sequence"]
         rcpt_json["auth_sequence"] = [EosAuth.from_json(a) for a in auths]
 
         return cls(**rcpt_json)
 
 
-@dataclass
+@dataclass(slots=True)
 class EosAction:
     # pylint: disable=too-many-instance-attributes
     """EosAction class."""
@@ -108,7 +115,7 @@ class EosAction:
     def from_json(cls, action_json):
         """Create EosAction from json."""
         # "@timestamp" duplicates "timestamp"
-        del action_json["@timestamp"]
+        action_json = drop_fields(action_json, {"@timestamp"})
 
         check_mismatched_fields(action_json, cls, EosChainException)
 
@@ -120,12 +127,20 @@ class EosAction:
 
         return cls(**action_json)
 
+    @classmethod
+    def canonical_json(cls, action_json):
+        """Return `action_json` without the fields excluded from equality comparison."""
+        return drop_fields(
+            action_json, dataclass_to_excluded_field_set(cls) | {"@timestamp"}
+        )
+
 
-@dataclass
+@dataclass(slots=True)
 class EosTransaction:
     # pylint: disable=too-many-instance-attributes
     """EosTransaction class."""
-    actions: list[EosAction]
+    # Raw actions, only parsed once they match the events of a chain state
+    actions: list[dict]
     cached_lib: bool = field(compare=False)
     executed: bool
     last_indexed_block: int = field(compare=False)
@@ -139,10 +154,37 @@ class EosTransaction:
 
     @classmethod
     def from_json(cls, tx_json):
-        """Create EosTransaction from json."""
+        """Create EosTransaction from json, leaving its actions as json."""
         check_mismatched_fields(tx_json, cls, EosChainException)
 
-        actions = tx_json["actions"]
-        tx_json["actions"] = [EosAction.from_json(a) for a in actions]
+        if not isinstance(tx_json["actions"], list):
+            raise EosChainException("Malformed transaction actions, expected a list")
 
         return cls(**tx_json)
+
+    @classmethod
+    def compact_json(cls, tx_json):
+        """Drop, in place, the `tx_json` action fields excluded from equality comparison.
+
+        Malformed json is returned as is, to be rejected once parsed."""
+        excluded = dataclass_to_excluded_field_set(EosAction) | {"@timestamp"}
+        if isinstance(tx_json, dict) and isinstance(tx_json.get("actions"), list):
+            for action_json in tx_json["actions"]:
+                if isinstance(action_json, dict):
+                    for excluded_field in excluded & action_json.keys():
+                        del action_json[excluded_field]
+
+        return tx_json
+
+    @classmethod
+    def canonical_json(cls, tx_json):
+        """Return `tx_json` without the fields excluded from equality comparison."""
+        canonical = drop_fields(tx_json, dataclass_to_excluded_field_set(cls))
+        canonical["actions"] = [EosAction.canonical_json(a) for a in tx_json["actions"]]
+
+        return canonical
+
+    @classmethod
+    def digest(cls, tx_json):
+        """Return the digest of `tx_json`, equal for transactions that compare as equal."""
+        return canonical_digest(cls.canonical_json(tx_json))
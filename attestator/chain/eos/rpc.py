@@ -1,23 +1,35 @@
 """EOS rpc functionality."""
 
-import ssl
-
-import aiohttp
+from http import HTTPStatus
 
 from aiohttp.client_exceptions import ClientError
 
 from ...utils import format_tx_id, format_url
-from .. import RpcException
+from .. import RpcException, RpcNotFoundException
+from ..session import DEFAULT_MAX_RESPONSE_SIZE, create_session, read_json
 from .chain import EosTransaction
 
 TX_ENDPOINT = "/v2/history/get_transaction"
+ACTIONS_ENDPOINT = "/v2/history/get_actions"
+
+
+def check_status(resp, endpoint):
+    """Raise `RpcException` if the aiohttp `resp` from `endpoint` doesn't have a 2xx status."""
+    if not HTTPStatus.OK <= resp.status < HTTPStatus.MULTIPLE_CHOICES:
+        raise RpcException(f"Request to {format_url(endpoint)} failed: HTTP {resp.status}")
 
 
-async def get_eos_transaction(tx_id, endpoint, session=None, cert=None):
-    """Get `tx_id` from `endpoint`, with optional aiohttp `session` and `cert` file, if provided."""
+async def get_eos_transaction(
+    tx_id, endpoint, session=None, cert=None, max_size=DEFAULT_MAX_RESPONSE_SIZE
+):
+    """Get `tx_id` transaction json from `endpoint`, with optional aiohttp `session` and `cert`.
+
+    A provided `session` is expected to be already configured for ssl, `cert` is ignored. Responses
+    larger than `max_size` bytes are rejected. Raise `RpcNotFoundException` if the endpoint doesn't
+    know the transaction, `RpcException` if it replied with any other error status."""
     close_session = False
     if session is None:
-        session = aiohttp.ClientSession()
+        session = create_session(cert)
         # Since we're outside of the context manager, the session needs to be closed manually below
         close_session = True
 
@@ -25,12 +37,14 @@ async def get_eos_transaction(tx_id, endpoint, session=None, cert=None):
         endpoint = endpoint[:-1]
     endpoint += TX_ENDPOINT
 
-    ssl_context = True
-    if cert is not None:
-        ssl_context = ssl.create_default_context(cafile=cert)
     try:
-        async with session.get(endpoint, params={"id": tx_id}, ssl=ssl_context) as resp:
-            eos_tx = EosTransaction.from_json(await resp.json())
+        async with session.get(endpoint, params={"id": tx_id}) as resp:
+            if resp.status == HTTPStatus.NOT_FOUND:
+                raise RpcNotFoundException(
+                    f"Transaction {format_tx_id(tx_id)} not found on {format_url(endpoint)}"
+                )
+            check_status(resp, endpoint)
+            eos_tx = await read_json(resp, max_size)
     except ClientError as exc:
         raise RpcException(
             f"Failed to get transaction {format_tx_id(tx_id)} from {format_url(endpoint)}: {exc}"
@@ -39,4 +53,58 @@ async def get_eos_transaction(tx_id, endpoint, session=None, cert=None):
         if close_session:
             await session.close()
 
-    return eos_tx
+    # Drop the bulky action fields that don't take part in consensus right away, since
+    # transactions are held in memory until every endpoint responds
+    return EosTransaction.compact_json(eos_tx)
+
+
+async def get_eos_actions(  # pylint: disable=too-many-arguments
+    event_index,
+    limit,
+    endpoint,
+    *,
+    session=None,
+    cert=None,
+    max_size=DEFAULT_MAX_RESPONSE_SIZE,
+):
+    """Get the json of the latest `limit` actions matching `event_index` from `endpoint`.
+
+    Actions are returned most recent first. A provided `session` is expected to be already
+    configured for ssl, `cert` is ignored. Responses larger than `max_size` bytes are rejected."""
+    close_session = False
+    if session is None:
+        session = create_session(cert)
+        # Since we're outside of the context manager, the session needs to be closed manually below
+        close_session = True
+
+    if endpoint.endswith("/"):
+        endpoint = endpoint[:-1]
+    endpoint += ACTIONS_ENDPOINT
+
+    params = {
+        "filter": ",".join(
+            f"{account}:{name}"
+            for account, names in sorted(event_index.items())
+            for name in sorted(names)
+        ),
+        "limit": limit,
+        "sort": "desc",
+    }
+    try:
+        async with session.get(endpoint, params=params) as resp:
+            check_status(resp, endpoint)
+            result = await read_json(resp, max_size)
+    except ClientError as exc:
+        raise RpcException(
+            f"Failed to get actions from {format_url(endpoint)}: {exc}"
+        ) from None
+    finally:
+        if close_session:
+            await session.close()
+
+    if not isinstance(result, dict) or not isinstance(
+        actions := result.get("actions"), list
+    ):
+        raise RpcException(f"Malformed actions from {format_url(endpoint)}")
+
+    return actions
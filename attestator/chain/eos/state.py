@@ -1,13 +1,23 @@
 """Store EOS blockchain state."""
 
+import functools
 import json
 
-from ...crypto import pk_to_pub, sha256_and_sign_with_key
-from ...utils import pad_bytes_with_zeros, to_0x_hex
 from .. import CHAIN, CHAIN_PROTOCOL, EOS, ChainState
+from ..session import DEFAULT_MAX_RESPONSE_SIZE
+from . import EosChainException
+from .chain import EosAction
 
 
 PROTOCOL = CHAIN_PROTOCOL[EOS]
+# Action names are followed by 96B of zeros, up to 128B
+EVENT_ACTION_PADDING_HEX = "00" * 32 * 3
+
+
+@functools.cache
+def encode_event_name(name):
+    """Serialize the account or action `name` as hex, left-padded with zeros to 32B."""
+    return name.encode().hex().rjust(64, "0")
 
 
 def encode_event_data(data):
@@ -18,11 +28,29 @@ def encode_event_data(data):
 class EosState(ChainState):
     """EosState class."""
 
-    def __init__(self, chain, events, event_consensus_threshold, rpcs):
-        self.chain = chain
-        self.events = events
-        self.threshold = event_consensus_threshold
-        self.rpcs = rpcs
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        chain,
+        event_index,
+        event_consensus_threshold,
+        endpoints,
+        *,
+        cert=None,
+        max_response_size=DEFAULT_MAX_RESPONSE_SIZE,
+    ):
+        super().__init__(
+            chain, event_consensus_threshold, endpoints, cert, max_response_size
+        )
+        self.event_index = event_index
+
+    @staticmethod
+    def compile_events(events):
+        """Return the `(account, name)` pairs of `events` as an account to action names index."""
+        event_index = {}
+        for account, name in events:
+            event_index.setdefault(account, set()).add(name)
+        return {account: frozenset(names) for account, names in event_index.items()}
 
     @property
     def chain_id(self):
@@ -30,17 +58,32 @@ class EosState(ChainState):
         return CHAIN[self.chain]["id"]
 
     def filter_transaction(self, transaction):
-        """Return alls the actions that match the events schema stored."""
+        """Return alls the actions that match the events schema stored.
+
+        Each action is returned with the `(account, name)` rule it matched. Only matching actions
+        are parsed from the transaction json actions. Malformed actions raise an
+        `EosChainException`."""
         matching_actions = []
-        for action in transaction.actions:
-            for account, name in self.events:
-                if action.act.account == account and action.act.name == name:
-                    matching_actions.append(action)
-                    break
+        for action_json in transaction.actions:
+            if not isinstance(action_json, dict):
+                raise EosChainException("Malformed action, expected an object")
+            if not isinstance(act_json := action_json.get("act"), dict):
+                raise EosChainException("Malformed action act, expected an object")
+            account, name = act_json.get("account"), act_json.get("name")
+            if not isinstance(account, str) or not isinstance(name, str):
+                raise EosChainException(
+                    "Malformed action act, expected account and name strings"
+                )
+            if name in self.event_index.get(account, ()):
+                matching_actions.append(
+                    ((account, name), EosAction.from_json(action_json))
+                )
         return matching_actions
 
-    def sign_actions(self, actions, version):
-        """Sign `actions` for `version` with the standard encoding.
+    async def sign_actions(self, actions, version):
+        """Sign `actions`, `(rule, action)` pairs, for `version` with the standard encoding.
+
+        Actions are signed in a single batch, off the event loop.
 
         Preimage encoding format:
             version:        1B
@@ -55,71 +98,22 @@ class EosState(ChainState):
             event-action:   128B
             event-data:     varlen
         """
-        signed_actions = []
-        for action in actions:
-            for account, name in self.events:
-                if action.act.account == account and action.act.name == name:
-                    data = action.act.data
-                    break
-            else:
-                continue
-
-            block_hash = bytes.fromhex(action.block_id)
-            tx_hash = bytes.fromhex(action.trx_id)
-
-            event_account = pad_bytes_with_zeros(account.encode(), 32)
-            event_action = pad_bytes_with_zeros(name.encode(), 32) + b"\x00" * 32 * 3
-            event_data = encode_event_data(data)
-
-            event_payload = event_account + event_action + event_data
-
-            preimage = (
-                version
-                + PROTOCOL
-                + self.chain_id
-                + block_hash
-                + tx_hash
-                + event_payload
+        encoder = self.preimage_encoder(version, PROTOCOL, EosChainException)
+        preimages = [
+            encoder.encode(
+                action.block_id,
+                action.trx_id,
+                encode_event_name(account),
+                encode_event_name(name),
+                EVENT_ACTION_PADDING_HEX,
+                encode_event_data(action.act.data).hex(),
             )
+            for (account, name), action in actions
+        ]
 
-            event_id, signature = sha256_and_sign_with_key(preimage, self.PK)
-
-            (
-                event_id,
-                r,
-                s,
-                v,
-                version,
-                protocol,
-                chain_id,
-                tx_id_hash,
-                block_id_hash,
-                event_payload,
-            ) = to_0x_hex(
-                event_id,
-                signature.r.to_bytes(32),
-                signature.s.to_bytes(32),
-                signature.v.to_bytes(),
-                version,
-                PROTOCOL,
-                self.chain_id,
-                tx_hash,
-                block_hash,
-                event_payload,
-            )
+        signatures = await self.signing_engine.sign(preimages)
 
-            signed_actions.append(
-                {
-                    "version": version,
-                    "protocol": protocol,
-                    "origin": chain_id,
-                    "data": data,
-                    "tx_id_hash": tx_id_hash,
-                    "block_id_hash": block_id_hash,
-                    "event_payload": event_payload,
-                    "event_id": event_id,
-                    "signature": {"r": r, "s": s, "v": v},
-                    "public_key": pk_to_pub(self.PK),
-                }
-            )
-        return signed_actions
+        return [
+            encoder.signed_event(preimage, signed, action.act.data)
+            for (_, action), preimage, signed in zip(actions, preimages, signatures)
+        ]
@@ -2,11 +2,16 @@
 
 from dataclasses import dataclass, field
 
-from ...utils import check_mismatched_fields
+from ...utils import (
+    canonical_digest,
+    check_mismatched_fields,
+    dataclass_to_excluded_field_set,
+    drop_fields,
+)
 from . import EvmChainException
 
 
-@dataclass
+@dataclass(slots=True)
 class EvmLog:
     """EvmLog class."""
 
@@ -30,8 +35,21 @@ class EvmLog:
 
         return cls(**log_json)
 
+    @classmethod
+    def canonical_json(cls, log_json):
+        """Return `log_json` without the fields excluded from equality comparison."""
+        return drop_fields(log_json, dataclass_to_excluded_field_set(cls))
+
+    @classmethod
+    def digest_logs(cls, logs_json):
+        """Return the digest of the `logs_json` list, equal for log lists that compare as equal."""
+        if not isinstance(logs_json, list):
+            raise EvmChainException("Malformed logs, expected a list")
+
+        return canonical_digest([cls.canonical_json(l) for l in logs_json])
+
 
-@dataclass
+@dataclass(slots=True)
 class EvmTransactionReceipt:
     """EvmTransactionReceipt class."""
 
@@ -43,7 +61,8 @@ class EvmTransactionReceipt:
     effectiveGasPrice: str
     from_: str
     gasUsed: str
-    logs: list[EvmLog]
+    # Raw logs, only parsed once they match the events of a chain state
+    logs: list[dict]
     logsBloom: str
     status: str
     to: str
@@ -55,7 +74,8 @@ class EvmTransactionReceipt:
 
     @classmethod
     def from_json(cls, rcpt_json):
-        """Create EvmTransactionReceipt from json."""
+        """Create EvmTransactionReceipt from json, leaving its logs as json."""
+        rcpt_json = rcpt_json.copy()
         try:
             rcpt_json["from_"] = rcpt_json.pop("from")
         except KeyError:
@@ -67,7 +87,20 @@ class EvmTransactionReceipt:
 
         check_mismatched_fields(rcpt_json, cls, EvmChainException)
 
-        logs = rcpt_json["logs"]
-        rcpt_json["logs"] = [EvmLog.from_json(l) for l in logs]
+        if not isinstance(rcpt_json["logs"], list):
+            raise EvmChainException("Malformed receipt logs, expected a list")
 
         return cls(**rcpt_json)
+
+    @classmethod
+    def canonical_json(cls, rcpt_json):
+        """Return `rcpt_json` without the fields excluded from equality comparison."""
+        canonical = drop_fields(rcpt_json, dataclass_to_excluded_field_set(cls))
+        canonical["logs"] = [EvmLog.canonical_json(l) for l in rcpt_json["logs"]]
+
+        return canonical
+
+    @classmethod
+    def digest(cls, rcpt_json):
+        """Return the digest of `rcpt_json`, equal for receipts that compare as equal."""
+        return canonical_digest(cls.canonical_json(rcpt_json))
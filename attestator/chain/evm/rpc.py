@@ -1,14 +1,13 @@
 """EVM rpc functionality."""
 
-import ssl
-
-import aiohttp
+import asyncio
 
 from aiohttp.client_exceptions import ClientError
 
 from ...utils import format_tx_id, format_url
-from .. import RpcException
-from .chain import EvmTransactionReceipt
+from .. import RpcException, RpcNotFoundException
+from ..endpoint import is_batch_failure
+from ..session import DEFAULT_MAX_RESPONSE_SIZE, create_session, read_json
 
 
 JSONRPC_PAYLOAD = {
@@ -16,24 +15,50 @@ JSONRPC_PAYLOAD = {
     "method": "eth_getTransactionReceipt",
     "id": 0,
 }
+GET_LOGS_PAYLOAD = {
+    "jsonrpc": "2.0",
+    "method": "eth_getLogs",
+    "id": 0,
+}
+
+# Many providers reject larger JSON-RPC batches
+MAX_JSONRPC_BATCH_SIZE = 50
+# Many providers reject larger eth_getLogs block ranges
+DEFAULT_GET_LOGS_BLOCK_RANGE = 1000
+
+
+def receipt_from_result(result, tx_id, endpoint):
+    """Return the receipt json from the JSON-RPC `result` for `tx_id`, raise if there's none.
+
+    Raise `RpcNotFoundException` if the endpoint doesn't know the transaction, `RpcException` if it
+    replied with an error."""
+    if (evm_tx := result.get("result")) is None:
+        exception = RpcException if "error" in result else RpcNotFoundException
+        raise exception(
+            f"Transaction {format_tx_id(tx_id)} not found on {format_url(endpoint)}: "
+            f"{result.get('error')}"
+        )
+
+    return evm_tx
 
 
-async def get_evm_transaction(tx_id, endpoint, session=None, cert=None):
-    """Get `tx_id` from `endpoint`, with optional aiohttp `session` and `cert` file, if provided."""
+async def get_evm_transaction(
+    tx_id, endpoint, session=None, cert=None, max_size=DEFAULT_MAX_RESPONSE_SIZE
+):
+    """Get `tx_id` receipt json from `endpoint`, with optional aiohttp `session` and `cert` file.
+
+    A provided `session` is expected to be already configured for ssl, `cert` is ignored. Responses
+    larger than `max_size` bytes are rejected."""
     close_session = False
     if session is None:
-        session = aiohttp.ClientSession()
+        session = create_session(cert)
         # Since we're outside of the context manager, the session needs to be closed manually below
         close_session = True
 
     payload = {"params": [tx_id], **JSONRPC_PAYLOAD}
-    ssl_context = True
-    if cert is not None:
-        ssl_context = ssl.create_default_context(cafile=cert)
     try:
-        async with session.post(endpoint, json=payload, ssl=ssl_context) as resp:
-            result = await resp.json()
-            evm_tx = EvmTransactionReceipt.from_json(result["result"])
+        async with session.post(endpoint, json=payload) as resp:
+            result = await read_json(resp, max_size)
     except ClientError as exc:
         raise RpcException(
             f"Failed to get transaction {format_tx_id(tx_id)} from {format_url(endpoint)}: {exc}"
@@ -42,4 +67,161 @@ async def get_evm_transaction(tx_id, endpoint, session=None, cert=None):
         if close_session:
             await session.close()
 
-    return evm_tx
+    return receipt_from_result(result, tx_id, endpoint)
+
+
+async def untracked(aw, failed=None):  # pylint: disable=unused-argument
+    """Return the result of the `aw` awaitable, the default `track` of batched requests."""
+    return await aw
+
+
+def is_failed_batch(evm_txs):
+    """Return whether every result of a `post_evm_batch` request failed due to the endpoint."""
+    return evm_txs is not None and is_batch_failure(evm_txs)
+
+
+async def get_evm_transactions(  # pylint: disable=too-many-arguments
+    tx_ids,
+    endpoint,
+    session=None,
+    cert=None,
+    max_size=DEFAULT_MAX_RESPONSE_SIZE,
+    *,
+    track=untracked,
+):
+    """Get receipt json for each of `tx_ids` from `endpoint` through JSON-RPC batch requests.
+
+    Return, for each of `tx_ids` and in order, either the receipt json or the exception raised while
+    getting it. Endpoints that don't support batch requests are queried once per transaction.
+    Every HTTP request is sent through `track`, called with its awaitable and an optional `failed`
+    predicate as `Endpoint.track` is, so that each is rate limited and timed out on its own.
+    A provided `session` is expected to be already configured for ssl, `cert` is ignored. Responses
+    larger than `max_size` bytes are rejected."""
+    close_session = False
+    if session is None:
+        session = create_session(cert)
+        # Since we're outside of the context manager, the session needs to be closed manually below
+        close_session = True
+
+    try:
+        chunks = await asyncio.gather(
+            *(
+                get_evm_transactions_chunk(
+                    tx_ids[idx : idx + MAX_JSONRPC_BATCH_SIZE],
+                    endpoint,
+                    session,
+                    max_size,
+                    track,
+                )
+                for idx in range(0, len(tx_ids), MAX_JSONRPC_BATCH_SIZE)
+            )
+        )
+    finally:
+        if close_session:
+            await session.close()
+
+    return [evm_tx for chunk in chunks for evm_tx in chunk]
+
+
+async def get_evm_transactions_chunk(tx_ids, endpoint, session, max_size, track):
+    """Get receipt json for each of `tx_ids` from `endpoint` through a single batch request.
+
+    Fall back to one request per transaction if batch requests are not supported."""
+    try:
+        evm_txs = await track(
+            post_evm_batch(tx_ids, endpoint, session, max_size),
+            failed=is_failed_batch,
+        )
+    except RpcException as exc:
+        return [exc] * len(tx_ids)
+
+    if evm_txs is not None:
+        return evm_txs
+
+    return await asyncio.gather(
+        *(
+            track(get_evm_transaction(tx_id, endpoint, session, max_size=max_size))
+            for tx_id in tx_ids
+        ),
+        return_exceptions=True,
+    )
+
+
+async def post_evm_batch(tx_ids, endpoint, session, max_size):
+    """Return the receipt json, or the exception raised, for each of `tx_ids` from `endpoint`.
+
+    Send a single batch request, return `None` if the endpoint doesn't support them."""
+    payload = [
+        {**JSONRPC_PAYLOAD, "params": [tx_id], "id": idx}
+        for idx, tx_id in enumerate(tx_ids)
+    ]
+    try:
+        async with session.post(endpoint, json=payload) as resp:
+            results = await read_json(resp, max_size)
+    except ClientError as exc:
+        raise RpcException(
+            f"Failed to get {len(tx_ids)} transactions from {format_url(endpoint)}: {exc}"
+        ) from None
+
+    if not isinstance(results, list):
+        # Batch requests are not supported, the endpoint replied with a single error object
+        return None
+
+    results = {r.get("id"): r for r in results if isinstance(r, dict)}
+    evm_txs = []
+    for idx, tx_id in enumerate(tx_ids):
+        try:
+            evm_txs.append(receipt_from_result(results.get(idx, {}), tx_id, endpoint))
+        except RpcException as exc:
+            evm_txs.append(exc)
+
+    return evm_txs
+
+
+async def get_evm_logs(  # pylint: disable=too-many-arguments
+    from_block,
+    to_block,
+    event_index,
+    endpoint,
+    *,
+    session=None,
+    cert=None,
+    max_size=DEFAULT_MAX_RESPONSE_SIZE,
+):
+    """Get the logs json between `from_block` and `to_block`, included, from `endpoint`.
+
+    Logs are only filtered by the addresses of the `event_index`. Its topics match at any position,
+    which `eth_getLogs` filters can't express, and are left to `EvmState.filter_logs`. A provided
+    `session` is expected to be already configured for ssl, `cert` is ignored. Responses larger
+    than `max_size` bytes are rejected."""
+    close_session = False
+    if session is None:
+        session = create_session(cert)
+        # Since we're outside of the context manager, the session needs to be closed manually below
+        close_session = True
+
+    log_filter = {
+        "fromBlock": hex(from_block),
+        "toBlock": hex(to_block),
+        "address": sorted(event_index),
+    }
+    payload = {"params": [log_filter], **GET_LOGS_PAYLOAD}
+    try:
+        async with session.post(endpoint, json=payload) as resp:
+            result = await read_json(resp, max_size)
+    except ClientError as exc:
+        raise RpcException(
+            f"Failed to get logs for blocks {from_block}-{to_block} from "
+            f"{format_url(endpoint)}: {exc}"
+        ) from None
+    finally:
+        if close_session:
+            await session.close()
+
+    if not isinstance(result, dict) or (logs := result.get("result")) is None:
+        raise RpcException(
+            f"Logs for blocks {from_block}-{to_block} not found on {format_url(endpoint)}: "
+            f"{result.get('error') if isinstance(result, dict) else result}"
+        )
+
+    return logs
@@ -1,21 +1,45 @@
 """Store EVM blockchain state."""
 
-from ...crypto import pk_to_pub, sha256_and_sign_with_key
-from ...utils import from_0x_hex, pad_bytes_with_zeros, to_0x_hex
 from .. import CHAIN, CHAIN_PROTOCOL, EVM, ChainState
+from ..session import DEFAULT_MAX_RESPONSE_SIZE
+from . import EvmChainException
+from .chain import EvmLog
+from .rpc import DEFAULT_GET_LOGS_BLOCK_RANGE
 
 
 PROTOCOL = CHAIN_PROTOCOL[EVM]
+# Topics are right-padded with zeros to 128B
+TOPICS_HEX_SIZE = 2 * 128
 
 
 class EvmState(ChainState):
     """EvmState class."""
 
-    def __init__(self, chain, events, event_consensus_threshold, rpcs):
-        self.chain = chain
-        self.events = events
-        self.threshold = event_consensus_threshold
-        self.rpcs = rpcs
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        chain,
+        event_index,
+        event_consensus_threshold,
+        endpoints,
+        *,
+        cert=None,
+        max_response_size=DEFAULT_MAX_RESPONSE_SIZE,
+        get_logs_block_range=DEFAULT_GET_LOGS_BLOCK_RANGE,
+    ):
+        super().__init__(
+            chain, event_consensus_threshold, endpoints, cert, max_response_size
+        )
+        self.event_index = event_index
+        self.get_logs_block_range = get_logs_block_range
+
+    @staticmethod
+    def compile_events(events):
+        """Return the `(address, topic)` pairs of `events` as a lowercase address to topics map."""
+        event_index = {}
+        for address, topic in events:
+            event_index.setdefault(address.lower(), set()).add(topic.lower())
+        return {address: frozenset(topics) for address, topics in event_index.items()}
 
     @property
     def chain_id(self):
@@ -23,17 +47,40 @@ class EvmState(ChainState):
         return CHAIN[self.chain]["id"]
 
     def filter_transaction(self, transaction):
-        """Return alls the logs that match the events schema stored."""
+        """Return alls the logs that match the events schema stored.
+
+        Each log is returned with the `(address, topic)` rule it matched. Only matching logs are
+        parsed from the transaction json logs."""
+        return self.filter_logs(transaction.logs)
+
+    def filter_logs(self, logs_json):
+        """Return the logs of the `logs_json` list that match the events schema stored.
+
+        Each log is returned, parsed, with the `(address, topic)` rule it matched. A rule topic
+        matches at any position in the log topics, not only as event signature. Malformed logs
+        raise an `EvmChainException`."""
         matching_logs = []
-        for log in transaction.logs:
-            for address, topic in self.events:
-                if log.address == address.lower() and topic.lower() in log.topics:
-                    matching_logs.append(log)
+        for log_json in logs_json:
+            if not isinstance(log_json, dict):
+                raise EvmChainException("Malformed log, expected an object")
+            if not isinstance(address := log_json.get("address"), str):
+                raise EvmChainException("Malformed log address, expected a string")
+            if (topics := self.event_index.get(address := address.lower())) is None:
+                continue
+            if not isinstance(log_topics := log_json.get("topics", []), list):
+                raise EvmChainException("Malformed log topics, expected a list")
+            for topic in log_topics:
+                if not isinstance(topic, str):
+                    raise EvmChainException("Malformed log topic, expected a string")
+                if (topic := topic.lower()) in topics:
+                    matching_logs.append(((address, topic), EvmLog.from_json(log_json)))
                     break
         return matching_logs
 
-    def sign_logs(self, logs, version):
-        """Sign `logs` for `version` with the standard encoding.
+    async def sign_logs(self, logs, version):
+        """Sign `logs`, `(rule, log)` pairs, for `version` with the standard encoding.
+
+        Logs are signed in a single batch, off the event loop.
 
         Preimage encoding format:
             version:        1B
@@ -48,61 +95,23 @@ class EvmState(ChainState):
             topics:         128B
             log-data:       varlen
         """
-        signed_logs = []
-        for log in logs:
-            block_hash, tx_hash, address, log_data = from_0x_hex(
-                log.blockHash, log.transactionHash, log.address, log.data
-            )
-
-            topics = pad_bytes_with_zeros(
-                b"".join(from_0x_hex(*log.topics)), 128, pad_right=True
+        encoder = self.preimage_encoder(version, PROTOCOL, EvmChainException)
+        preimages = [
+            encoder.encode(
+                log.blockHash[2:],
+                log.transactionHash[2:],
+                log.address[2:],
+                "".join(topic[2:] for topic in log.topics).ljust(TOPICS_HEX_SIZE, "0"),
+                log.data[2:],
             )
+            for _, log in logs
+        ]
 
-            event_payload = address + topics + log_data
-
-            preimage = (
-                version
-                + PROTOCOL
-                + self.chain_id
-                + block_hash
-                + tx_hash
-                + event_payload
-            )
-
-            event_id, signature = sha256_and_sign_with_key(preimage, self.PK)
-
-            (
-                event_id,
-                r,
-                s,
-                v,
-                version,
-                protocol,
-                chain_id,
-                event_payload,
-            ) = to_0x_hex(
-                event_id,
-                signature.r.to_bytes(32),
-                signature.s.to_bytes(32),
-                signature.v.to_bytes(),
-                version,
-                PROTOCOL,
-                self.chain_id,
-                event_payload,
-            )
+        signatures = await self.signing_engine.sign(preimages)
 
-            signed_logs.append(
-                {
-                    "version": version,
-                    "protocol": protocol,
-                    "origin": chain_id,
-                    "data": log.data,
-                    "tx_id_hash": log.transactionHash,
-                    "block_id_hash": log.blockHash,
-                    "event_payload": event_payload,
-                    "event_id": event_id,
-                    "signature": {"r": r, "s": s, "v": v},
-                    "public_key": pk_to_pub(self.PK),
-                }
+        return [
+            encoder.signed_event(
+                preimage, signed, log.data, log.transactionHash, log.blockHash
             )
-        return signed_logs
+            for (_, log), preimage, signed in zip(logs, preimages, signatures)
+        ]
@@ -0,0 +1,82 @@
+"""Event preimage encoding, shared by every protocol."""
+
+HASH_SIZE = 32
+
+
+class PreimageEncoder:
+    """PreimageEncoder class.
+
+    Encodes the preimages of the events signed with `version`, for `protocol` and `chain_id`, and
+    formats them once signed. The constant `version + protocol + origin` prefix and its hex fields,
+    as well as the `public_key`, are computed once per encoder, and each preimage is decoded from
+    its hex fields in a single pass. Malformed fields raise `exception`.
+
+    Preimage encoding format:
+        version:        1B
+        protocol:       1B
+        origin:         32B
+        block-hash:     32B
+        tx-hash:        32B
+        event-payload:  varlen
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, version, protocol, chain_id, public_key, exception=ValueError):
+        self.prefix_hex = (version + protocol + chain_id).hex()
+        self.version_hex = "0x" + version.hex()
+        self.protocol_hex = "0x" + protocol.hex()
+        self.origin_hex = "0x" + chain_id.hex()
+        self.public_key = public_key
+        self.exception = exception
+
+        self.block_hash_offset = len(version + protocol + chain_id)
+        self.tx_hash_offset = self.block_hash_offset + HASH_SIZE
+        self.event_payload_offset = self.tx_hash_offset + HASH_SIZE
+
+    def encode(self, block_hash, tx_hash, *event_payload):
+        """Return the preimage for the given unprefixed hex fields.
+
+        Fields are checked one by one, so that a malformed one can't shift the others."""
+        if len(block_hash) != 2 * HASH_SIZE or len(tx_hash) != 2 * HASH_SIZE:
+            raise self.exception(f"Invalid block or tx hash: {block_hash}, {tx_hash}")
+        if any(len(e) % 2 for e in event_payload):
+            raise self.exception(f"Odd-length event payload field: {event_payload}")
+
+        try:
+            return bytes.fromhex(
+                "".join((self.prefix_hex, block_hash, tx_hash, *event_payload))
+            )
+        except ValueError as exc:
+            raise self.exception(f"Invalid event hex field: {exc}") from None
+
+    def signed_event(self, preimage, signed, data, tx_id_hash=None, block_id_hash=None):
+        """Return the signed event for `preimage` and its `(event_id, signature)` pair.
+
+        Block and tx hashes are taken from the preimage, unless provided."""
+        event_id, signature = signed
+        view = memoryview(preimage)
+        if block_id_hash is None:
+            block_id_hash = (
+                "0x" + view[self.block_hash_offset : self.tx_hash_offset].hex()
+            )
+        if tx_id_hash is None:
+            tx_id_hash = (
+                "0x" + view[self.tx_hash_offset : self.event_payload_offset].hex()
+            )
+
+        return {
+            "version": self.version_hex,
+            "protocol": self.protocol_hex,
+            "origin": self.origin_hex,
+            "data": data,
+            "tx_id_hash": tx_id_hash,
+            "block_id_hash": block_id_hash,
+            "event_payload": "0x" + view[self.event_payload_offset :].hex(),
+            "event_id": "0x" + event_id.hex(),
+            "signature": {
+                "r": f"0x{signature.r:064x}",
+                "s": f"0x{signature.s:064x}",
+                "v": f"0x{signature.v:02x}",
+            },
+            "public_key": self.public_key,
+        }
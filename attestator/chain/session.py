@@ -0,0 +1,62 @@
+"""Pooled aiohttp sessions for outbound rpc requests."""
+
+import json
+import ssl
+
+import aiohttp
+
+
+# Connection pool settings, shared by every chain state session
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 10
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+# Response bodies are read in chunks, up to a maximum size
+DEFAULT_MAX_RESPONSE_SIZE = 2**24
+READ_CHUNK_SIZE = 2**16
+
+
+def create_ssl_context(cert=None):
+    """Return an ssl context trusting the optional `cert` file, `True` for the system defaults."""
+    if cert is None:
+        return True
+    return ssl.create_default_context(cafile=cert)
+
+
+def create_session(cert=None):
+    """Return a keep-alive aiohttp session, with optional `cert` file.
+
+    Needs to be called with a running event loop."""
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ssl=create_ssl_context(cert),
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
+async def read_json(resp, max_size=DEFAULT_MAX_RESPONSE_SIZE):
+    """Return the json body of the aiohttp `resp`, read in chunks as it arrives.
+
+    Raise `aiohttp.ClientPayloadError` as soon as the body exceeds `max_size` bytes, or if it's not
+    valid json."""
+    if resp.content_length is not None and resp.content_length > max_size:
+        raise aiohttp.ClientPayloadError(
+            f"Response body too large: {resp.content_length} > {max_size} bytes"
+        )
+
+    body = bytearray()
+    async for chunk in resp.content.iter_chunked(READ_CHUNK_SIZE):
+        body += chunk
+        if len(body) > max_size:
+            raise aiohttp.ClientPayloadError(
+                f"Response body too large: more than {max_size} bytes"
+            )
+
+    try:
+        return json.loads(body)
+    except ValueError as exc:
+        raise aiohttp.ClientPayloadError(f"Invalid json body: {exc}") from None
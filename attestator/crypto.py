@@ -1,5 +1,10 @@
 """Hashing, signing and private key generation."""
 
+import asyncio
+import multiprocessing
+import os
+
+from concurrent.futures import ProcessPoolExecutor
 from hashlib import sha256
 
 from eth_account import Account
@@ -25,3 +30,77 @@ def sha256_and_sign_with_key(message: bytes, key: Account):
     message = hasher.digest()
 
     return message, key.unsafe_sign_hash(message)
+
+
+# Signing key of the current signing worker process
+_WORKER_KEY = None
+
+
+def init_signing_worker(private_key: bytes):
+    """Set the signing key of the current signing worker process."""
+    global _WORKER_KEY  # pylint: disable=global-statement
+    # pylint: disable=no-value-for-parameter
+    _WORKER_KEY = Account.from_key(private_key)
+
+
+def sha256_and_sign_batch(messages: list[bytes]):
+    """Return hash and signature for each of `messages` with the signing worker key."""
+    return [sha256_and_sign_with_key(message, _WORKER_KEY) for message in messages]
+
+
+class SigningEngine:
+    """SigningEngine class.
+
+    Signs batches of messages with `key`, off the event loop, in a pool of `workers` processes,
+    one per cpu by default. Signing is CPU-bound, and eth_keys' default backend is pure python, so
+    processes rather than threads are needed for it to scale. eth_keys switches to its faster
+    `coincurve` backend on its own, when installed."""
+
+    def __init__(self, key: Account, workers=None):
+        self.key = key
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+
+    def start(self):
+        """Start the worker processes, if not already running.
+
+        Better called before the event loop starts any thread, since workers are forked."""
+        if self.executor is None:
+            # Forked workers don't need to re-import the main module, unlike spawned ones
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=init_signing_worker,
+                initargs=(bytes(self.key.key),),
+            )
+            # Workers are only started on the first submission
+            self.executor.submit(int).result()
+
+    def close(self):
+        """Stop the worker processes, cancelling pending batches."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def sign(self, messages: list[bytes]):
+        """Return hash and signature for each of `messages`, in order.
+
+        Messages are split in a chunk per worker, to limit inter-process overhead."""
+        if not messages:
+            return []
+        self.start()
+
+        loop = asyncio.get_running_loop()
+        chunk_size = -(-len(messages) // self.workers)
+        chunks = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self.executor,
+                    sha256_and_sign_batch,
+                    messages[idx : idx + chunk_size],
+                )
+                for idx in range(0, len(messages), chunk_size)
+            )
+        )
+
+        return [signed for chunk in chunks for signed in chunk]
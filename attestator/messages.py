@@ -1,7 +1,13 @@
 """VSock message conversions, representation and constants."""
 
+import asyncio
 import dataclasses
 import json
+import struct
+
+
+# Stream reader limit, batch requests and responses easily exceed asyncio's 64 KiB default
+MAX_MESSAGE_SIZE = 2**26
 
 
 def dict_to_vsock_message(dct):
@@ -14,6 +20,102 @@ def vsock_message_to_dict(msg):
     return json.loads(msg[:-1].decode())
 
 
+# Framing modes, selected by the client at connection start
+JSON_FRAMING = "json"
+BINARY_FRAMING = "binary"
+FRAMINGS = (JSON_FRAMING, BINARY_FRAMING)
+
+# Sent by the client to select binary framing, a json message can't start with it
+BINARY_FRAMING_PREAMBLE = b"\x00"
+# Binary frame header: payload version and payload length
+FRAME_HEADER = struct.Struct(">BI")
+# Compact json payload, hex strings included: frames only change how messages are delimited
+FRAME_VERSION = 1
+
+
+def dict_to_vsock_frame(dct):
+    """Dump `dct` as compact json, encode and prefix it with the binary frame header."""
+    payload = json.dumps(dct, separators=(",", ":")).encode()
+    return FRAME_HEADER.pack(FRAME_VERSION, len(payload)) + payload
+
+
+def vsock_frame_payload_to_dict(version, payload):
+    """Load the `payload` of a binary frame with the given `version`."""
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version {version}")
+    return json.loads(payload)
+
+
+class VSockConnection:
+    """VSockConnection class.
+
+    Reads and writes messages through a `reader` and `writer` pair, with either newline-terminated
+    json or length-prefixed binary framing. Binary frames need no newline scanning, and are not
+    bound by the stream reader line limit."""
+
+    def __init__(self, reader, writer, framing=JSON_FRAMING, prefix=b""):
+        self.reader = reader
+        self.writer = writer
+        self.framing = framing
+        # Bytes already consumed from `reader` while negotiating the framing
+        self.prefix = prefix
+
+    @classmethod
+    def connect(cls, reader, writer, framing=JSON_FRAMING):
+        """Return a client-side VSockConnection, announcing the `framing` to the server."""
+        if framing not in FRAMINGS:
+            raise ValueError(f"Unsupported framing {framing}")
+        if framing == BINARY_FRAMING:
+            writer.write(BINARY_FRAMING_PREAMBLE)
+        return cls(reader, writer, framing)
+
+    @classmethod
+    async def accept(cls, reader, writer):
+        """Return a server-side VSockConnection, with the framing selected by the client."""
+        prefix = await reader.read(len(BINARY_FRAMING_PREAMBLE))
+        if prefix == BINARY_FRAMING_PREAMBLE:
+            return cls(reader, writer, BINARY_FRAMING)
+        return cls(reader, writer, JSON_FRAMING, prefix)
+
+    async def read(self):
+        """Return the next message as a dictionary, `None` once the stream is over."""
+        if self.framing == BINARY_FRAMING:
+            try:
+                header = await self.reader.readexactly(FRAME_HEADER.size)
+            except asyncio.IncompleteReadError as exc:
+                if exc.partial:
+                    raise
+                return None
+
+            version, size = FRAME_HEADER.unpack(header)
+            if size > MAX_MESSAGE_SIZE:
+                raise ValueError(f"Frame too large: {size}")
+            return vsock_frame_payload_to_dict(
+                version, await self.reader.readexactly(size)
+            )
+
+        msg = self.prefix + await self.reader.readline()
+        self.prefix = b""
+        if not msg:
+            return None
+        return vsock_message_to_dict(msg)
+
+    def write(self, dct):
+        """Write `dct` as a message, the writer needs to be drained separately."""
+        if self.framing == BINARY_FRAMING:
+            self.writer.write(dict_to_vsock_frame(dct))
+        else:
+            self.writer.writelines([dict_to_vsock_message(dct)])
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if (msg := await self.read()) is None:
+            raise StopAsyncIteration
+        return msg
+
+
 # This doesn't tecnically need to be a dataclass, but this pleases the code analyzer
 # (`dataclass.asdict` requires to be passed a dataclass instance)
 @dataclasses.dataclass
@@ -35,6 +137,21 @@ GET_ATTESTATION = "get-attestation"
 PING = "ping"
 PONG = "pong"
 SIGN_EVENT = "sign-event"
+SIGN_EVENTS = "sign-events"
+SIGN_BLOCK_RANGE = "sign-block-range"
+METRICS = "metrics"
+REQUEST_TYPES = (
+    GET_ATTESTATION,
+    METRICS,
+    PING,
+    SIGN_BLOCK_RANGE,
+    SIGN_EVENT,
+    SIGN_EVENTS,
+)
+
+# Metrics formats, Prometheus text by default
+PROMETHEUS_METRICS = "prometheus"
+JSON_METRICS = "json"
 
 
 @dataclasses.dataclass
@@ -43,13 +160,20 @@ class VSockRequest(VsockMessage):
 
     request_type: str
     args: list
+    # Echoed back in the response, it allows concurrent requests on the same connection
+    request_id: int | None = None
 
 
 ERROR_RESPONSE = "error"
+INTERNAL_ERROR = "internal-error"
+INVALID_ARGUMENTS = "invalid-arguments"
 INVALID_REQUEST_TYPE = "invalid-request-type"
 NOT_ENOUGH_ARGUMENTS = "not-enough-arguments"
 NO_CONFIG = "server-started-with-no-config"
+# Streamed requests get any number of partial responses, before their final response
+PARTIAL_RESPONSE = "partial"
 SUCCESS_RESPONSE = "success"
+TOO_MANY_ARGUMENTS = "too-many-arguments"
 UNINITIALIZED = "uninitialized"
 
 
@@ -59,3 +183,4 @@ class VSockResponse(VsockMessage):
 
     response_type: str
     response: list
+    request_id: int | None = None
@@ -0,0 +1,270 @@
+"""In-process metrics, exported in the Prometheus text format."""
+
+import asyncio
+import bisect
+import math
+
+
+# Seconds, from sub-millisecond vsock round trips to slow RPC requests
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+HTTP_REQUEST_TIMEOUT = 10
+
+
+def format_value(value):
+    """Format a sample `value` as Prometheus expects it."""
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def format_labels(labels):
+    """Format the `(name, value)` pairs of `labels` as a Prometheus label set."""
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Value:
+    """Value class.
+
+    A counter or gauge sample, updated in place."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Increase the value by `amount`."""
+        self.value += amount
+
+    def dec(self, amount=1):
+        """Decrease the value by `amount`, gauges only."""
+        self.value -= amount
+
+    def set(self, value):
+        """Set the value, gauges only."""
+        self.value = value
+
+    def samples(self, name, labels):
+        """Yield the `(name, labels, value)` samples of the value."""
+        yield name, labels, self.value
+
+    def snapshot(self):
+        """Return the value, json serializable."""
+        return self.value
+
+
+class Distribution:
+    """Distribution class.
+
+    A histogram sample, counting the observed values falling in each of the `buckets` upper
+    bounds, as well as their total count and sum."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Count an observed `value`."""
+        if (index := bisect.bisect_left(self.buckets, value)) < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        """Yield the `(name, labels, value)` samples of the distribution, buckets cumulated."""
+        cumulated = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulated += count
+            yield f"{name}_bucket", (*labels, ("le", format_value(bound))), cumulated
+        yield f"{name}_bucket", (*labels, ("le", "+Inf")), self.count
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+    def snapshot(self):
+        """Return the count, sum and approximate median and 99th percentile, json serializable."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding the `q` quantile.
+
+        Returns `None` without values, or for quantiles above the last bucket."""
+        cumulated = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulated += count
+            if self.count and cumulated >= q * self.count:
+                return bound
+        return None
+
+
+class Metric:
+    """Metric class.
+
+    A family of `kind` samples sharing a `name` and `documentation`, one for each combination of
+    values of its `labelnames`. Samples are created on first use, with the `factory`. Metrics with a
+    `function` have no samples of their own, it is called on collection instead, and returns the
+    values of each combination of label values."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, name, documentation, kind, labelnames=(), *, factory=Value, function=None
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.function = function
+
+        self.children = {}
+
+    def labels(self, *values):
+        """Return the sample for the given label `values`, created if needed.
+
+        Samples are to be kept by callers updating them often."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}")
+        if (child := self.children.get(values)) is None:
+            child = self.children[values] = self.factory()
+        return child
+
+    def items(self):
+        """Return the `(label values, sample)` pairs of the metric."""
+        if self.function is None:
+            return list(self.children.items())
+
+        items = []
+        for values, value in self.function().items():
+            child = Value()
+            child.value = value
+            items.append((values if isinstance(values, tuple) else (values,), child))
+        return items
+
+    def render(self):
+        """Yield the lines of the metric in the Prometheus text format."""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in self.items():
+            for name, labels, value in child.samples(
+                self.name, tuple(zip(self.labelnames, values))
+            ):
+                yield f"{name}{format_labels(labels)} {format_value(value)}"
+
+    def snapshot(self):
+        """Return the samples of the metric with their labels, json serializable."""
+        return [
+            {"labels": dict(zip(self.labelnames, values)), "value": child.snapshot()}
+            for values, child in self.items()
+        ]
+
+
+class Registry:
+    """Registry class.
+
+    Holds metrics by name, and exports them all at once."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        """Add `metric` to the registry, and return it.
+
+        A metric registered again, with the same kind and labels, is returned instead, its function
+        replaced, so that the latest instance registering it is the one read from."""
+        if (registered := self.metrics.get(metric.name)) is None:
+            self.metrics[metric.name] = metric
+            return metric
+
+        if (registered.kind, registered.labelnames) != (metric.kind, metric.labelnames):
+            raise ValueError(f"Metric {metric.name} already registered")
+        registered.function = metric.function
+        return registered
+
+    def counter(self, name, documentation, labelnames=(), function=None):
+        """Register and return a counter metric."""
+        return self.register(
+            Metric(name, documentation, COUNTER, labelnames, function=function)
+        )
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        """Register and return a gauge metric."""
+        return self.register(
+            Metric(name, documentation, GAUGE, labelnames, function=function)
+        )
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Register and return a histogram metric, with the given bucket upper `buckets` bounds."""
+        buckets = tuple(sorted(buckets))
+        return self.register(
+            Metric(
+                name,
+                documentation,
+                HISTOGRAM,
+                labelnames,
+                factory=lambda: Distribution(buckets),
+            )
+        )
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        return "".join(
+            f"{line}\n" for metric in self.metrics.values() for line in metric.render()
+        )
+
+    def snapshot(self):
+        """Return the samples of every metric by name, json serializable."""
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+
+# Metrics of the attestator server process, shared by the modules it's made of
+REGISTRY = Registry()
+
+
+async def serve_metrics(registry, host, port):
+    """Start serving the `registry` metrics over HTTP on `host` and `port`, to any request.
+
+    Returns the `asyncio.Server`."""
+
+    async def respond(reader, writer):
+        try:
+            await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HTTP_REQUEST_TIMEOUT)
+            body = registry.render().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                + f"Content-Type: {CONTENT_TYPE}\r\n".encode()
+                + f"Content-Length: {len(body)}\r\n".encode()
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        except (
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            asyncio.TimeoutError,
+            ConnectionError,
+        ):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(respond, host, port)
@@ -2,12 +2,23 @@
 
 import argparse
 import asyncio
+import collections
+import dataclasses
+import errno
+import fcntl
+import logging
+import os
+import signal
 import socket
+import struct
 import sys
+import time
 import urllib.parse
 
 import toml
 
+from .metrics import Registry, serve_metrics
+
 
 class ForwardException(Exception):
     """ForwardException class."""
@@ -21,19 +32,498 @@ def range_generator(start):
 
 
 SOCK_BUF = 1024
+SOCK_BACKLOG = 128
+
+# Pump buffers start small, and double up to their maximum size when filled by a single read
+MIN_BUFFER_SIZE = 2**14
+MAX_BUFFER_SIZE = 2**18
+
+SPLICE_PUMP = "splice"
+COPY_PUMP = "copy"
+PUMPS = (SPLICE_PUMP, COPY_PUMP)
+DEFAULT_PUMP = SPLICE_PUMP if hasattr(os, "splice") else COPY_PUMP
+
+# Idle pre-connected sockets kept per upstream, on top of its forwarded connections cap, opt-in
+DEFAULT_POOL_SIZE = 0
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_CONNECT_TIMEOUT = 5.0
+# Upstream hosts may close connections that don't send anything for a while
+DEFAULT_POOL_IDLE_TIMEOUT = 10.0
+# Forwarded connections without traffic in either direction for this long are closed
+DEFAULT_IDLE_TIMEOUT = 300.0
+REAP_INTERVAL = 1.0
+
+# Seconds, forwarded connections range from single requests to long-lived keep-alive ones
+LIFETIME_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 3600.0)
+NO_HOSTNAME = "no_hostname"
+UNKNOWN_HOST = "unknown_host"
+
+TLS_HANDSHAKE = 0x16
+TLS_CLIENT_HELLO = 0x01
+# Content type, protocol version and fragment length
+TLS_RECORD_HEADER = struct.Struct(">BHH")
+# Message type and 24-bit message length
+TLS_HANDSHAKE_HEADER_SIZE = 4
+TLS_SNI_EXTENSION = 0x0000
+TLS_SNI_HOST_NAME = 0x00
+# Large enough for ClientHellos with post-quantum key shares, or for HTTP request headers
+MAX_HOSTNAME_BUF = 2**16
+HOSTNAME_TIMEOUT = 10
+
+
+logger = logging.getLogger(__name__)
+
+
+def route_key(host):
+    """Return the routing key for `host`, with an optional port: its lowercase hostname."""
+    return (urllib.parse.urlsplit(f"//{host}").hostname or host.lower()).rstrip(".")
+
+
+def parse_client_hello_sni(hello):
+    """Return the SNI hostname of the `hello` ClientHello message body, `None` if there's none."""
+    try:
+        # Client version and random
+        offset = 2 + 32
+        # Length-prefixed session id, cipher suites and compression methods
+        for size in (1, 2, 1):
+            offset += size + int.from_bytes(hello[offset : offset + size])
+        if offset == len(hello):
+            # No extensions
+            return None
+
+        (extensions_size,) = struct.unpack_from(">H", hello, offset)
+        offset += 2
+        extensions_end = offset + extensions_size
+        while offset < extensions_end:
+            extension, extension_size = struct.unpack_from(">HH", hello, offset)
+            offset += 4
+            if extension != TLS_SNI_EXTENSION:
+                offset += extension_size
+                continue
+
+            # Skip the server name list length, to its `(type, length, name)` entries
+            names_end, offset = offset + extension_size, offset + 2
+            while offset < names_end:
+                name_type, name_size = struct.unpack_from(">BH", hello, offset)
+                offset += 3
+                if name_type == TLS_SNI_HOST_NAME:
+                    if offset + name_size > len(hello):
+                        raise ForwardException("Truncated server name")
+                    return hello[offset : offset + name_size].decode("ascii")
+                offset += name_size
+            return None
+    except (struct.error, UnicodeDecodeError) as exc:
+        raise ForwardException(f"Malformed ClientHello: {exc}") from None
+
+    return None
+
+
+def handshake_size(handshake):
+    """Return the size of the TLS handshake message starting `handshake`, `None` if unknown yet."""
+    if len(handshake) < TLS_HANDSHAKE_HEADER_SIZE:
+        return None
+    return TLS_HANDSHAKE_HEADER_SIZE + int.from_bytes(
+        handshake[1:TLS_HANDSHAKE_HEADER_SIZE]
+    )
+
+
+def parse_sni(buf):
+    """Return the SNI hostname of the TLS ClientHello at the start of `buf`.
+
+    The ClientHello can span any number of TLS records. Return `None` if `buf` doesn't hold it
+    entirely yet, raise `ForwardException` if it's malformed or has no SNI."""
+    handshake, offset = bytearray(), 0
+    while (size := handshake_size(handshake)) is None or len(handshake) < size:
+        if len(buf) < offset + TLS_RECORD_HEADER.size:
+            return None
+        content_type, _, record_size = TLS_RECORD_HEADER.unpack_from(buf, offset)
+        if content_type != TLS_HANDSHAKE:
+            raise ForwardException(f"Unexpected TLS record type {content_type}")
+
+        offset += TLS_RECORD_HEADER.size
+        if len(buf) < offset + record_size:
+            return None
+        handshake += buf[offset : offset + record_size]
+        offset += record_size
+
+    if handshake[0] != TLS_CLIENT_HELLO:
+        raise ForwardException(f"Unexpected TLS handshake message {handshake[0]}")
+
+    hello = bytes(handshake[TLS_HANDSHAKE_HEADER_SIZE:size])
+    if (hostname := parse_client_hello_sni(hello)) is None:
+        raise ForwardException("ClientHello without SNI")
+    return hostname
+
+
+def parse_http_host(buf):
+    """Return the Host header of the HTTP request at the start of `buf`.
+
+    Return `None` if `buf` doesn't hold the request headers entirely yet, raise `ForwardException`
+    if there's no Host header."""
+    if (end := buf.find(b"\r\n\r\n")) < 0:
+        return None
+
+    for line in bytes(buf[:end]).split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"host":
+            return value.strip().decode("ascii", errors="replace")
+    raise ForwardException("HTTP request without Host header")
+
+
+async def read_hostname(sock):
+    """Read from `sock` up to the hostname the connection is for, return it with the data read.
+
+    The hostname is taken from the TLS ClientHello SNI, or from the Host header of plain HTTP
+    requests."""
+    loop = asyncio.get_running_loop()
+    buf = bytearray()
+    while True:
+        if not (msg := await loop.sock_recv(sock, SOCK_BUF)):
+            raise ForwardException("Connection closed before the hostname was received")
+        buf += msg
+
+        parse = parse_sni if buf[0] == TLS_HANDSHAKE else parse_http_host
+        if (hostname := parse(buf)) is not None:
+            return hostname, bytes(buf)
+        if len(buf) > MAX_HOSTNAME_BUF:
+            raise ForwardException(f"No hostname within {MAX_HOSTNAME_BUF} bytes")
+
+
+async def wait_ready(add, remove, sock):
+    """Wait for `sock` to be ready, as registered with the `add` and `remove` loop methods."""
+    future = asyncio.get_running_loop().create_future()
+    add(sock.fileno(), lambda: future.done() or future.set_result(None))
+    try:
+        await future
+    finally:
+        remove(sock.fileno())
+
+
+async def copy_pump(
+    src, dst, min_size=MIN_BUFFER_SIZE, max_size=MAX_BUFFER_SIZE, progress=None
+):
+    """Forward `src` into `dst` until EOF, through a reused buffer.
+
+    The buffer starts at `min_size` bytes, and doubles up to `max_size` each time a read fills it,
+    so that bulk transfers take few, large, reads. The optional `progress` function is called with
+    the size of each read."""
+    loop = asyncio.get_running_loop()
+    size = min_size
+    buf = memoryview(bytearray(size))
+    while received := await loop.sock_recv_into(src, buf):
+        if progress is not None:
+            progress(received)
+        await loop.sock_sendall(dst, buf[:received])
+        if received == size and size < max_size:
+            size = min(2 * size, max_size)
+            buf = memoryview(bytearray(size))
+
+
+async def splice_pump(
+    src, dst, min_size=MIN_BUFFER_SIZE, max_size=MAX_BUFFER_SIZE, progress=None
+):
+    """Forward `src` into `dst` until EOF, through a pipe, without copying data to user space.
+
+    Falls back to `copy_pump` if the sockets don't support splicing. The optional `progress`
+    function is called with the size of each read."""
+    loop = asyncio.get_running_loop()
+    flags = os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK
+    pipe_r, pipe_w = os.pipe2(os.O_NONBLOCK)
+    try:
+        try:
+            fcntl.fcntl(pipe_w, fcntl.F_SETPIPE_SZ, max_size)
+        except OSError:
+            # Over the system pipe size limit, keep the default size
+            pass
+
+        spliced = False
+        while True:
+            try:
+                received = os.splice(src.fileno(), pipe_w, max_size, flags=flags)
+            except BlockingIOError:
+                await wait_ready(loop.add_reader, loop.remove_reader, src)
+                continue
+            except OSError as exc:
+                if exc.errno != errno.EINVAL or spliced:
+                    raise
+                logger.debug("Splicing not supported, copying instead")
+                return await copy_pump(src, dst, min_size, max_size, progress)
+            if not received:
+                return None
+
+            spliced = True
+            if progress is not None:
+                progress(received)
+            while received:
+                try:
+                    received -= os.splice(pipe_r, dst.fileno(), received, flags=flags)
+                except BlockingIOError:
+                    await wait_ready(loop.add_writer, loop.remove_writer, dst)
+    finally:
+        os.close(pipe_r)
+        os.close(pipe_w)
+
+
+PUMP = {SPLICE_PUMP: splice_pump, COPY_PUMP: copy_pump}
+
+
+class HostMetrics:  # pylint: disable=too-few-public-methods
+    """HostMetrics class.
+
+    Samples of the forwarder metrics of the `registry` for the upstream `host`, looked up once so
+    that updating them costs no more than an attribute update."""
+
+    def __init__(self, registry, host):
+        metrics = registry.metrics
+        self.connections = metrics["forwarder_connections_total"].labels(host)
+        self.active = metrics["forwarder_connections_active"].labels(host)
+        self.failures = metrics["forwarder_upstream_failures_total"].labels(host)
+        self.setup = metrics["forwarder_connection_setup_seconds"].labels(host)
+        self.lifetime = metrics["forwarder_connection_lifetime_seconds"].labels(host)
+        self.bytes_in = metrics["forwarder_bytes_total"].labels(host, "in")
+        self.bytes_out = metrics["forwarder_bytes_total"].labels(host, "out")
+
+
+def is_alive(sock):
+    """Return whether the idle connection `sock` is still open, with nothing received on it."""
+    try:
+        sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    # Either EOF, or data the upstream should not have sent before any request
+    return False
+
+
+class UpstreamPool:
+    """UpstreamPool class.
+
+    Connects to the upstream `ports` of `host`, with `family` sockets, keeping up to `size` idle
+    pre-connected sockets per port, refilled in the background. Connections handed out for a port
+    are capped to `max_connections`, and connecting takes at most `connect_timeout` seconds. Idle
+    sockets are reaped once `idle_timeout` seconds old, or as soon as the upstream closes them.
+    Every idle socket is checked to still be open before being handed out."""
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        host,
+        family,
+        ports,
+        *,
+        size=DEFAULT_POOL_SIZE,
+        max_connections=DEFAULT_MAX_CONNECTIONS,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT,
+    ):
+        self.host = host
+        self.family = family
+        self.size = size
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+
+        # Idle sockets of each port, with the time they connected at, oldest first
+        self.idle = {port: collections.deque() for port in ports}
+        # Sockets of each port handed out
+        self.connections = dict.fromkeys(ports, 0)
+        self.refilling = {}
+        self.reaper = None
+
+        self.hits = 0
+        self.misses = 0
+        self.reaped = 0
+
+    def start(self):
+        """Start filling the pool and reaping its idle sockets, if not already started."""
+        if self.reaper is None and self.size:
+            self.reaper = asyncio.create_task(self.reap_forever())
+            for port in self.idle:
+                self.refill(port)
+
+    async def close(self):
+        """Stop filling the pool, and close its idle sockets."""
+        tasks = list(self.refilling.values())
+        if self.reaper is not None:
+            tasks.append(self.reaper)
+            self.reaper = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for idle in self.idle.values():
+            while idle:
+                idle.popleft()[1].close()
+
+    async def connect(self, port):
+        """Return a new socket connected to `port`, raise if it takes too long or fails."""
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            await asyncio.wait_for(
+                asyncio.get_running_loop().sock_connect(sock, (self.host, port)),
+                self.connect_timeout,
+            )
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    async def acquire(self, port):
+        """Return a socket connected to `port`, from the pool if possible.
+
+        The socket is to be given back with `release` once done with, raise if the cap is reached
+        or if connecting fails."""
+        if self.connections[port] >= self.max_connections:
+            raise ForwardException(
+                f"Upstream port {port} at its {self.max_connections} connections cap"
+            )
+
+        self.connections[port] += 1
+        try:
+            sock = self.take_idle(port)
+            if sock is not None:
+                self.hits += 1
+                return sock
+
+            self.misses += 1
+            try:
+                return await self.connect(port)
+            except asyncio.TimeoutError:
+                raise ForwardException(
+                    f"Upstream port {port} did not accept within {self.connect_timeout}s"
+                ) from None
+        except BaseException:
+            self.connections[port] -= 1
+            raise
+        finally:
+            self.refill(port)
+
+    def take_idle(self, port):
+        """Return the most recent idle socket connected to `port` still open, `None` if none."""
+        idle = self.idle[port]
+        while idle:
+            _, sock = idle.pop()
+            if is_alive(sock):
+                return sock
+            self.reaped += 1
+            sock.close()
+        return None
+
+    def release(self, port, sock):
+        """Close the `sock` connection to `port`, once done with."""
+        sock.close()
+        self.connections[port] -= 1
+
+    def refill(self, port):
+        """Fill the idle sockets of `port` up to the pool size in the background, if not already."""
+        if self.reaper is None or port in self.refilling:
+            return
+        if len(self.idle[port]) >= self.size:
+            return
+
+        task = asyncio.create_task(self.fill(port))
+        self.refilling[port] = task
+        task.add_done_callback(lambda _: self.refilling.pop(port, None))
+
+    async def fill(self, port):
+        """Connect idle sockets to `port` up to the pool size, until a failure."""
+        idle = self.idle[port]
+        while len(idle) < self.size:
+            try:
+                sock = await self.connect(port)
+            except (ForwardException, OSError, asyncio.TimeoutError) as exc:
+                # Retried on the next reaping
+                logger.debug("Failed to pre-connect to port %s: %s", port, exc)
+                return
+            idle.append((time.monotonic(), sock))
+
+    async def reap_forever(self):
+        """Reap idle sockets every `REAP_INTERVAL` seconds, refilling the pool, until stopped."""
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            self.reap()
+
+    def reap(self):
+        """Close the idle sockets which timed out, or which the upstream closed."""
+        deadline = time.monotonic() - self.idle_timeout
+        for port, idle in self.idle.items():
+            for connected_at, sock in list(idle):
+                if connected_at < deadline or not is_alive(sock):
+                    idle.remove((connected_at, sock))
+                    self.reaped += 1
+                    sock.close()
+            self.refill(port)
+
+
+@dataclasses.dataclass
+class ForwardOptions:  # pylint: disable=too-many-instance-attributes
+    """ForwardOptions class.
+
+    Data is forwarded in both directions with the `pump` function, through buffers of
+    `min_buffer_size` to `max_buffer_size` bytes. Connections idle in both directions for
+    `idle_timeout` seconds are closed. The other options configure the `UpstreamPool`, its
+    `pool_idle_timeout` being its `idle_timeout`."""
+
+    pump: str = DEFAULT_PUMP
+    min_buffer_size: int = MIN_BUFFER_SIZE
+    max_buffer_size: int = MAX_BUFFER_SIZE
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT
+    pool_size: int = DEFAULT_POOL_SIZE
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    pool_idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT
+
+    def __post_init__(self):
+        self.max_buffer_size = max(self.min_buffer_size, self.max_buffer_size)
 
 
 class ForwardServer:
-    """ForwardServer class."""
+    """ForwardServer class.
+
+    Forwards each incoming connection to the port of the host it's for, according to the `rpc_map`
+    host to port map, through an `UpstreamPool`, as configured by the `ForwardOptions` `options`.
+    Traffic metrics are collected per host of `rpc_map` into the `registry`."""
 
-    def __init__(self, rpc_map, host, debug_mode):
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, rpc_map, host, debug_mode, options=None, registry=None):
         self.rpc_map = rpc_map
         self.host = host
         self.debug_mode = debug_mode
+        self.options = ForwardOptions() if options is None else options
+        self.pump = PUMP[self.options.pump]
+
+        # Maps the lowercase hostnames of `rpc_map` to their ports
+        self.routes = {route_key(rpc): port for rpc, port in rpc_map.items()}
+        self.pool = UpstreamPool(
+            host,
+            socket.AF_INET if debug_mode else socket.AF_VSOCK,
+            rpc_map.values(),
+            size=self.options.pool_size,
+            max_connections=self.options.max_connections,
+            connect_timeout=self.options.connect_timeout,
+            idle_timeout=self.options.pool_idle_timeout,
+        )
+
+        self.registry = Registry() if registry is None else registry
+        self.register_metrics()
+        # Maps the ports of `rpc_map` to the metrics of their host
+        self.metrics = {
+            port: HostMetrics(self.registry, rpc) for rpc, port in rpc_map.items()
+        }
+        # Maps the reasons for dropping connections to their metric
+        routing_failures = self.registry.metrics["forwarder_routing_failures_total"]
+        self.routing_failures = {
+            reason: routing_failures.labels(reason)
+            for reason in (NO_HOSTNAME, UNKNOWN_HOST)
+        }
 
     @classmethod
-    def from_config_toml(cls, config, host, starting_port, debug_mode):
-        """Build an ForwardServer with the given configuration."""
+    def from_config_toml(cls, config, host, starting_port, debug_mode, **kwargs):
+        """Build an ForwardServer with the given configuration.
+
+        Keyword arguments are passed to the constructor."""
         config_toml = toml.load(config)
 
         rpcs = set()
@@ -43,47 +533,182 @@ class ForwardServer:
             )
         rpcs = dict(zip(sorted(rpcs), range_generator(starting_port)))
 
-        return cls(rpcs, host, debug_mode)
+        return cls(rpcs, host, debug_mode, **kwargs)
 
-    async def run(self, reader, writer):
-        """Run the server once a stream as been established."""
-        request_url_buf = await reader.read(SOCK_BUF)
-        for rpc, port in self.rpc_map.items():
-            if rpc.encode() in request_url_buf:
-                break
-        else:
-            raise ForwardException("Request url not configured")
+    def register_metrics(self):
+        """Register the forwarder metrics into the registry."""
+        hosts = {port: rpc for rpc, port in self.rpc_map.items()}
+        self.registry.counter(
+            "forwarder_connections_total", "Connections forwarded", ("host",)
+        )
+        self.registry.gauge(
+            "forwarder_connections_active", "Connections being forwarded", ("host",)
+        )
+        self.registry.counter(
+            "forwarder_upstream_failures_total",
+            "Connections dropped for failing to connect to their upstream",
+            ("host",),
+        )
+        self.registry.counter(
+            "forwarder_routing_failures_total",
+            "Connections dropped without a configured hostname",
+            ("reason",),
+        )
+        self.registry.histogram(
+            "forwarder_connection_setup_seconds",
+            "Time taken to get a connection to the upstream",
+            ("host",),
+        )
+        self.registry.histogram(
+            "forwarder_connection_lifetime_seconds",
+            "Lifetime of forwarded connections",
+            ("host",),
+            buckets=LIFETIME_BUCKETS,
+        )
+        self.registry.counter(
+            "forwarder_bytes_total",
+            "Bytes forwarded, in to the upstream or out of it",
+            ("host", "direction"),
+        )
+        self.registry.gauge(
+            "forwarder_pool_idle",
+            "Idle pre-connected upstream connections",
+            ("host",),
+            function=lambda: {hosts[p]: len(i) for p, i in self.pool.idle.items()},
+        )
+        for name, documentation in (
+            ("hits", "Upstream connections taken from the pool"),
+            ("misses", "Upstream connections opened on demand"),
+            ("reaped", "Idle pre-connected upstream connections closed"),
+        ):
+            self.registry.counter(
+                f"forwarder_pool_{name}_total",
+                documentation,
+                function=lambda name=name: {(): getattr(self.pool, name)},
+            )
 
-        if self.debug_mode:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        else:
-            sock = socket.socket(socket.AF_VSOCK, socket.SOCK_STREAM)
-        sock.connect((self.host, port))
+    async def serve_forever(self, host, port):
+        """Accept connections on `host` and `port`, each run in its own task."""
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        with socket.create_server((host, port), backlog=SOCK_BACKLOG) as server_sock:
+            server_sock.setblocking(False)
+            self.pool.start()
+            try:
+                while True:
+                    sock, _ = await loop.sock_accept(server_sock)
+                    task = asyncio.create_task(self.run(sock))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await self.pool.close()
 
-        reader_out, writer_out = await asyncio.open_connection(sock=sock)
-        writer_out.write(request_url_buf)
-        await writer_out.drain()
+    async def run(self, sock):
+        """Run the server once the `sock` connection as been established.
 
-        await asyncio.gather(forward(reader, writer_out), forward(reader_out, writer))
+        Connections for hosts not configured are logged and closed."""
+        loop = asyncio.get_running_loop()
+        sock.setblocking(False)
+        try:
+            hostname, request_url_buf = await asyncio.wait_for(
+                read_hostname(sock), HOSTNAME_TIMEOUT
+            )
+        except (ForwardException, OSError, asyncio.TimeoutError) as exc:
+            self.routing_failures[NO_HOSTNAME].inc()
+            logger.warning("Dropping connection: %s", exc or "no hostname in time")
+            sock.close()
+            return
+        if (port := self.routes.get(route_key(hostname))) is None:
+            self.routing_failures[UNKNOWN_HOST].inc()
+            logger.warning("Dropping connection: Host %s not configured", hostname)
+            sock.close()
+            return
 
+        metrics = self.metrics[port]
+        metrics.connections.inc()
+        metrics.active.inc()
+        start = time.monotonic()
+        with sock:
+            try:
+                sock_out = await self.pool.acquire(port)
+            except (ForwardException, OSError) as exc:
+                metrics.failures.inc()
+                metrics.active.dec()
+                logger.warning("Failed to connect to %s: %s", hostname, exc)
+                return
+            metrics.setup.observe(time.monotonic() - start)
 
-async def forward(reader, writer):
-    """Forward the `reader` stream into the `writer`, until it's closed.
+            try:
+                await loop.sock_sendall(sock_out, request_url_buf)
+                metrics.bytes_in.inc(len(request_url_buf))
+                await self.forward(sock, sock_out, metrics)
+            except OSError as exc:
+                logger.warning("Failed to forward to %s: %s", hostname, exc)
+            finally:
+                self.pool.release(port, sock_out)
+                metrics.active.dec()
+                metrics.lifetime.observe(time.monotonic() - start)
 
-    Some hosts might misbehave and close their end of the socket without so much as an EOF. Drop the
-    ensuing `OSError`."""
-    try:
-        while msg := await reader.read(SOCK_BUF):
-            writer.write(msg)
-            await writer.drain()
-    except OSError:
-        pass
+    async def forward(self, sock, sock_out, metrics):
+        """Forward data between `sock` and `sock_out`, in both directions, until both are done.
 
-    try:
-        writer.close()
-        await writer.wait_closed()
-    except OSError:
-        pass
+        Each direction is done on EOF, which is passed along. Some hosts might misbehave and close
+        their end of the socket without so much as an EOF: both directions are then stopped, and the
+        ensuing `OSError` dropped. Both are also stopped once idle for `idle_timeout` seconds, as
+        some clients never close their connections. Bytes forwarded are counted in the host
+        `metrics`."""
+        idle_timeout = self.options.idle_timeout
+        last_activity = time.monotonic()
+
+        def progress_in(size):
+            nonlocal last_activity
+            last_activity = time.monotonic()
+            metrics.bytes_in.inc(size)
+
+        def progress_out(size):
+            nonlocal last_activity
+            last_activity = time.monotonic()
+            metrics.bytes_out.inc(size)
+
+        pumps = [
+            asyncio.ensure_future(self.pump_until_eof(sock, sock_out, progress_in)),
+            asyncio.ensure_future(self.pump_until_eof(sock_out, sock, progress_out)),
+        ]
+        try:
+            pending, timeout = set(pumps), idle_timeout
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION
+                )
+                for pump in done:
+                    pump.result()
+                if (idle := time.monotonic() - last_activity) >= idle_timeout:
+                    logger.info("Closing connection idle for %.0fs", idle)
+                    break
+                timeout = idle_timeout - idle
+        except OSError:
+            pass
+        finally:
+            for pump in pumps:
+                pump.cancel()
+            # Sockets can't be closed while still registered by a pump
+            await asyncio.gather(*pumps, return_exceptions=True)
+
+    async def pump_until_eof(self, src, dst, progress=None):
+        """Forward `src` into `dst` until EOF, then shut down the writing side of `dst`."""
+        await self.pump(
+            src,
+            dst,
+            self.options.min_buffer_size,
+            self.options.max_buffer_size,
+            progress,
+        )
+        try:
+            dst.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
 
 
 EXPORT_AS_VSOCK_PROXY_SCRIPT = "--export-as-vsock-proxy-script"
@@ -143,6 +768,67 @@ async def main(args):
         help="print to stdout a vsock proxy launcher script \
               that will correctly proxy the forwarder's requests",
     )
+    parser.add_argument(
+        "--pump",
+        choices=PUMPS,
+        default=DEFAULT_PUMP,
+        help="how data is forwarded: spliced between sockets, without copies to user space, \
+              where supported, or copied through reused buffers",
+    )
+    parser.add_argument(
+        "--min-buffer-size",
+        type=int,
+        default=MIN_BUFFER_SIZE,
+        help="initial forwarding buffer size, in bytes",
+    )
+    parser.add_argument(
+        "--max-buffer-size",
+        type=int,
+        default=MAX_BUFFER_SIZE,
+        help="maximum forwarding buffer size, in bytes, buffers grow up to it on bulk transfers",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help="seconds without traffic in either direction before a connection is closed",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help="idle connections kept pre-connected to each upstream, opt-in, connections are \
+              opened on demand by default",
+    )
+    parser.add_argument(
+        "--pool-idle-timeout",
+        type=float,
+        default=DEFAULT_POOL_IDLE_TIMEOUT,
+        help="seconds after which pre-connected idle connections are closed and replaced",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=DEFAULT_MAX_CONNECTIONS,
+        help="maximum forwarded connections to each upstream, idle pre-connected ones excluded",
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help="seconds an upstream has to accept a connection",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="port to serve traffic metrics on, in the Prometheus text format, \
+              metrics are also logged on SIGUSR1",
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default="127.0.0.1",
+        help="host to serve traffic metrics on",
+    )
     parser.add_argument(
         "--allow-list-path",
         default="vsock-proxy-allowlist.yaml",
@@ -152,7 +838,20 @@ async def main(args):
 
     host = args.host if args.debug else args.cid
     forward_server = ForwardServer.from_config_toml(
-        args.config, host, args.out_port, args.debug
+        args.config,
+        host,
+        args.out_port,
+        args.debug,
+        options=ForwardOptions(
+            pump=args.pump,
+            min_buffer_size=args.min_buffer_size,
+            max_buffer_size=args.max_buffer_size,
+            idle_timeout=args.idle_timeout,
+            pool_size=args.pool_size,
+            max_connections=args.max_connections,
+            connect_timeout=args.connect_timeout,
+            pool_idle_timeout=args.pool_idle_timeout,
+        ),
     )
 
     if args.export_as_allow_list:
@@ -167,12 +866,18 @@ async def main(args):
         for rpc, port in forward_server.rpc_map.items():
             print(f"vsock-proxy --config {args.allow_list_path} {port} {rpc} 443 &")
     else:
-        server = await asyncio.start_server(
-            forward_server.run, host="0.0.0.0", port=args.port
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1,
+            lambda: logger.info("Metrics:\n%s", forward_server.registry.render()),
         )
-
-        await server.serve_forever()
+        if args.metrics_port is not None:
+            await serve_metrics(
+                forward_server.registry, args.metrics_host, args.metrics_port
+            )
+        await forward_server.serve_forever("0.0.0.0", args.port)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+
     asyncio.run(main(sys.argv[1:]))
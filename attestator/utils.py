@@ -1,7 +1,10 @@
 """Library utilities."""
 
 import dataclasses
+import functools
+import json
 
+from hashlib import sha256
 from urllib.parse import urlparse
 
 
@@ -10,12 +13,12 @@ def check_mismatched_fields(json_dict, dataclass, exception):
 
     Fields are mismatched when they are either not provided but requested, or provided but not
     requested."""
-    provided_not_requested = set(json_dict) - dataclass_to_field_set(
+    provided_not_requested = json_dict.keys() - dataclass_to_field_set(
         dataclass, include_nullable=True
     )
     not_provided_requested = dataclass_to_field_set(
         dataclass, include_nullable=False
-    ) - set(json_dict)
+    ) - json_dict.keys()
 
     if mismatched := provided_not_requested | not_provided_requested:
         raise exception(
@@ -23,16 +26,37 @@ def check_mismatched_fields(json_dict, dataclass, exception):
         )
 
 
+@functools.cache
 def dataclass_to_field_set(dataclass, include_nullable):
     """Extract a set of fields names from a dataclass.
 
     If `include_nullable` is set to `False`, the returned list will not contain names for fields
-    that default to `None`."""
+    that default to `None`. Sets are computed once per dataclass."""
     fields = dataclasses.fields(dataclass)
     if not include_nullable:
         fields = tuple(f for f in fields if f.default is not None)
 
-    return {f.name for f in fields}
+    return frozenset(f.name for f in fields)
+
+
+@functools.cache
+def dataclass_to_excluded_field_set(dataclass):
+    """Extract the set of field names excluded from equality comparison in a dataclass."""
+    return frozenset(f.name for f in dataclasses.fields(dataclass) if not f.compare)
+
+
+def drop_fields(json_dict, fields):
+    """Return a shallow copy of `json_dict` without the given `fields`."""
+    return {k: v for k, v in json_dict.items() if k not in fields}
+
+
+def canonical_digest(json_obj):
+    """Return the sha256 digest of the canonical json serialization of `json_obj`.
+
+    Equal json objects share the same digest, regardless of the order of their keys."""
+    return sha256(
+        json.dumps(json_obj, separators=(",", ":"), sort_keys=True).encode()
+    ).digest()
 
 
 def format_set(_set):
@@ -0,0 +1 @@
+"""Attestator micro and end-to-end benchmarks."""
@@ -0,0 +1,8 @@
+"""End-to-end signing benchmark.
+
+Runs the attestator server in debug mode, in its own process, against local stand-in EVM JSON-RPC
+or Hyperion endpoints with configurable latency, jitter, error rate, disagreement rate and payload
+size, and requests signed events at a configurable concurrency, through `AttestatorClientPool`
+connections or through the API served by gunicorn. Reports throughput, request latency, and the
+CPU time and memory of the server, API and stand-in processes, on Linux, with no network needed.
+Run with `python -m benchmarks.e2e`."""
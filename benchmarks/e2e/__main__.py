@@ -0,0 +1,350 @@
+"""End-to-end signing benchmark entrypoint."""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from attestator.attestator_client.pool import AttestatorClientPool
+from attestator.messages import SIGN_EVENT, SUCCESS_RESPONSE
+
+from ..traffic_forwarder import cpu_time, free_port, wait_listening
+from .standin import (
+    EOS_ACCOUNT,
+    EOS_ACTION,
+    EVENT_ADDRESS,
+    EVENT_TOPIC,
+    add_standin_arguments,
+)
+
+
+CLIENT = "client"
+API = "api"
+CHAINS = ("ethereum", "eos")
+
+
+def process_tree(pid):
+    """Return the ids of the Linux process `pid` and of its descendants."""
+    pids = [pid]
+    for parent in pids:
+        try:
+            for task in os.listdir(f"/proc/{parent}/task"):
+                with open(
+                    f"/proc/{parent}/task/{task}/children", encoding="ascii"
+                ) as children:
+                    pids.extend(int(child) for child in children.read().split())
+        except FileNotFoundError:
+            # Exited meanwhile
+            pass
+    return pids
+
+
+def resident_memory(pid):
+    """Return the resident memory, in bytes, of the Linux process `pid`."""
+    with open(f"/proc/{pid}/status", encoding="ascii") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def usage(pid):
+    """Return the CPU time of each process of the `pid` tree, and their total resident memory."""
+    cpu, rss = {}, 0
+    for child in process_tree(pid):
+        try:
+            cpu[child] = cpu_time(child)
+            rss += resident_memory(child)
+        except FileNotFoundError:
+            pass
+    return cpu, rss
+
+
+def cpu_used(before, after):
+    """Return the CPU time used between the `before` and `after` usages of a process tree."""
+    return sum(cpu - before[0].get(pid, 0.0) for pid, cpu in after[0].items())
+
+
+def tx_id(chain, index):
+    """Return the id of the `index`th benchmark transaction on `chain`."""
+    return f"{index:064x}" if chain == "eos" else f"0x{index:064x}"
+
+
+def write_config(config, args, ports):
+    """Write the attestator server configuration for the stand-in endpoints on `ports`."""
+    if args.chain == "eos":
+        endpoints = [f"http://127.0.0.1:{port}" for port in ports]
+        events = f'[["{EOS_ACCOUNT}", "{EOS_ACTION}"]]'
+    else:
+        endpoints = [f"http://127.0.0.1:{port}/" for port in ports]
+        events = f'[["{EVENT_ADDRESS}", "{EVENT_TOPIC}"]]'
+
+    config.write(
+        f"[networks.{args.chain}]\n"
+        f"endpoints = {json.dumps(endpoints)}\n"
+        f"consensus_threshold = {args.threshold}\n"
+        f"events = {events}\n"
+    )
+    if args.server_config is not None:
+        with open(args.server_config, encoding="utf-8") as extra:
+            config.write(extra.read())
+    config.flush()
+
+
+def start(command, env=None):
+    """Start `command` in its own process, discarding its logs."""
+    return subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", *command],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def stop(process):
+    """Stop `process` and wait for it, stopping its descendants too, such as signing workers."""
+    descendants = process_tree(process.pid)[1:]
+    process.terminate()
+    process.wait()
+    for pid in descendants:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+async def drive(request, tx_ids, concurrency):
+    """Send `request` for each of `tx_ids`, `concurrency` at once.
+
+    Returns the latencies of the successful requests and the number of failed ones."""
+    remaining = iter(tx_ids)
+    latencies, failures = [], 0
+
+    async def worker():
+        nonlocal failures
+        for request_tx_id in remaining:
+            request_start = time.monotonic()
+            try:
+                succeeded = await request(request_tx_id)
+            except Exception:  # pylint: disable=broad-exception-caught
+                succeeded = False
+            if succeeded:
+                latencies.append(time.monotonic() - request_start)
+            else:
+                failures += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failures
+
+
+async def standin_stats(session, ports):
+    """Return the stand-in counters, summed over the endpoints on `ports`."""
+    stats = {}
+    for port in ports:
+        async with session.get(f"http://127.0.0.1:{port}/stats") as resp:
+            for name, value in (await resp.json()).items():
+                stats[name] = stats.get(name, 0) + value
+    return stats
+
+
+async def run(args):
+    """Run the benchmark, return the results to report."""
+    standin_ports = [free_port() for _ in range(args.endpoints)]
+    server_port, api_port = free_port(), free_port()
+    client_args = ["-d", "--host", "127.0.0.1", "-p", str(server_port)]
+    client_args += ["--pool-size", str(args.connections)]
+
+    processes = {}
+    with tempfile.NamedTemporaryFile("w", suffix=".toml") as config:
+        write_config(config, args, standin_ports)
+        try:
+            processes["stand-ins"] = start(
+                [
+                    "benchmarks.e2e.standin",
+                    *map(str, standin_ports),
+                    f"--latency={args.latency}",
+                    f"--jitter={args.jitter}",
+                    f"--error-rate={args.error_rate}",
+                    f"--disagreement-rate={args.disagreement_rate}",
+                    f"--events={args.events}",
+                    f"--payload-size={args.payload_size}",
+                    *([] if args.seed is None else [f"--seed={args.seed}"]),
+                ]
+            )
+            processes["server"] = start(
+                [
+                    "attestator.attestator_server",
+                    config.name,
+                    "--debug",
+                    "--host",
+                    "127.0.0.1",
+                    "--port",
+                    str(server_port),
+                ]
+            )
+            for port in (*standin_ports, server_port):
+                await wait_listening(port)
+
+            if args.through == API:
+                processes["api"] = start(
+                    [
+                        "gunicorn",
+                        "-w",
+                        str(args.api_workers),
+                        "-k",
+                        "aiohttp.GunicornWebWorker",
+                        "-b",
+                        f"127.0.0.1:{api_port}",
+                        "attestator.api:api_app",
+                    ],
+                    env={
+                        **os.environ,
+                        "ATTESTATOR_CLIENT_CONFIG": " ".join(client_args),
+                    },
+                )
+                await wait_listening(api_port)
+
+            return await measure(args, processes, client_args, api_port, standin_ports)
+        finally:
+            for process in reversed(processes.values()):
+                stop(process)
+
+
+async def measure(args, processes, client_args, api_port, standin_ports):
+    """Warm up then measure the load on the started `processes`."""
+    # pylint: disable=too-many-locals
+    pool = AttestatorClientPool.from_args(client_args)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=args.concurrency), timeout=timeout
+    ) as session:
+
+        async def client_request(request_tx_id):
+            response = await asyncio.wait_for(
+                pool.request(SIGN_EVENT, [args.chain, request_tx_id]), args.timeout
+            )
+            return response.response_type == SUCCESS_RESPONSE
+
+        async def api_request(request_tx_id):
+            async with session.post(
+                f"http://127.0.0.1:{api_port}/",
+                json={
+                    "method": "getSignedEvent",
+                    "params": [args.chain, request_tx_id],
+                },
+            ) as resp:
+                await resp.read()
+                return resp.status == 200
+
+        request = api_request if args.through == API else client_request
+        distinct = args.distinct or args.requests
+        # Warm-up transactions are never requested again, to keep them out of the cache
+        await drive(
+            request,
+            (tx_id(args.chain, distinct + i) for i in range(args.warmup)),
+            args.concurrency,
+        )
+
+        before = {name: usage(p.pid) for name, p in processes.items()}
+        standins_before = await standin_stats(session, standin_ports)
+        start_time = time.monotonic()
+        latencies, failures = await drive(
+            request,
+            (tx_id(args.chain, i % distinct) for i in range(args.requests)),
+            args.concurrency,
+        )
+        elapsed = time.monotonic() - start_time
+        after = {name: usage(p.pid) for name, p in processes.items()}
+        standins_after = await standin_stats(session, standin_ports)
+
+    await pool.close()
+    resources = {
+        name: (cpu_used(before[name], after[name]), after[name][1]) for name in after
+    }
+    standins = {k: v - standins_before.get(k, 0) for k, v in standins_after.items()}
+    return latencies, failures, elapsed, resources, standins
+
+
+def percentile(values, q):
+    """Return the `q` percentile of the sorted `values`, `nan` without values."""
+    if not values:
+        return float("nan")
+    return values[min(int(q / 100 * len(values)), len(values) - 1)]
+
+
+def main():
+    """Run the benchmark and print throughput, latency and resource usage."""
+    parser = argparse.ArgumentParser(prog=__package__)
+    parser.add_argument("--chain", choices=CHAINS, default="ethereum", help="chain")
+    parser.add_argument(
+        "--through",
+        choices=(CLIENT, API),
+        default=CLIENT,
+        help="send requests through client connections or through the API",
+    )
+    parser.add_argument(
+        "-n", "--requests", type=int, default=2000, help="measured requests"
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=32, help="requests in flight"
+    )
+    parser.add_argument(
+        "--distinct",
+        type=int,
+        default=None,
+        help="distinct transactions requested in turn, all of them by default",
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=100, help="unmeasured requests sent first"
+    )
+    parser.add_argument(
+        "--connections", type=int, default=4, help="client connections to the server"
+    )
+    parser.add_argument(
+        "--api-workers", type=int, default=1, help="gunicorn workers serving the API"
+    )
+    parser.add_argument(
+        "--endpoints", type=int, default=3, help="stand-in endpoints of the chain"
+    )
+    parser.add_argument(
+        "--threshold", type=int, default=2, help="consensus threshold of the chain"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=30.0, help="request timeout in seconds"
+    )
+    parser.add_argument(
+        "--server-config",
+        default=None,
+        help="toml tables appended to the generated server configuration",
+    )
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+
+    latencies, failures, elapsed, resources, standins = asyncio.run(run(args))
+
+    latencies.sort()
+    print(f"{'throughput':>20}: {args.requests / elapsed:8.1f} requests/s")
+    print(f"{'failures':>20}: {failures:8d}")
+    print(f"{'latency p50':>20}: {percentile(latencies, 50) * 1e3:8.1f} ms")
+    print(f"{'latency p99':>20}: {percentile(latencies, 99) * 1e3:8.1f} ms")
+    for name in ("server", "api", "stand-ins"):
+        if name not in resources:
+            continue
+        cpu, rss = resources[name]
+        print(f"{name + ' cpu':>20}: {cpu / args.requests * 1e3:8.2f} ms/request")
+        print(f"{name + ' rss':>20}: {rss / 2**20:8.1f} MiB")
+    print(
+        f"{'stand-in requests':>20}: {standins['requests']:8d}"
+        f" ({standins['errors']} failed, {standins['disagreements']} disagreeing)"
+    )
+    print(f"{'cpus':>20}: {os.cpu_count()}")
+
+
+main()
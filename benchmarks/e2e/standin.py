@@ -0,0 +1,296 @@
+"""Stand-in EVM JSON-RPC and Hyperion endpoints.
+
+Run with `python -m benchmarks.e2e.standin PORT [PORT ...]` to serve one endpoint per port."""
+
+import argparse
+import asyncio
+import hashlib
+import random
+
+from aiohttp import web
+
+
+EVENT_ADDRESS = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+EVENT_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+EOS_ACCOUNT = "eosio.token"
+EOS_ACTION = "transfer"
+
+TIMESTAMP = "2024-01-01T00:00:00.000"
+
+
+def payload(tx_id, index, size):
+    """Return `size` bytes of event data, derived from `tx_id` and the event `index`."""
+    digest = hashlib.sha256(f"{tx_id}:{index}".encode()).digest()
+    return (digest * (size // len(digest) + 1))[:size]
+
+
+class StandIn:
+    """StandIn class.
+
+    Serves `eth_getTransactionReceipt` JSON-RPC requests, single or batched, and Hyperion
+    `get_transaction` requests, for any transaction id. Each transaction holds `events` events
+    matching the benchmark configuration, with `payload_size` bytes of data, derived from the
+    transaction id only, so that stand-ins agree with each other.
+
+    Responses are delayed by `latency` seconds, plus up to `jitter` more. A fraction `error_rate` of
+    requests fails, and a fraction `disagreement_rate` of transactions is reported with altered
+    event data, as a faulty endpoint would. Counters are served as json on `/stats`."""
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(
+        self,
+        *,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        disagreement_rate=0.0,
+        events=1,
+        payload_size=32,
+        seed=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.disagreement_rate = disagreement_rate
+        self.events = events
+        self.payload_size = payload_size
+        self.random = random.Random(seed)
+
+        self.requests = 0
+        self.errors = 0
+        self.disagreements = 0
+
+        self.app = web.Application()
+        self.app.router.add_post("/", self.evm)
+        self.app.router.add_get("/v2/history/get_transaction", self.eos)
+        self.app.router.add_get("/stats", self.stats)
+        self.runner = None
+
+    async def start(self, host, port):
+        """Start serving on `host` and `port`."""
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def close(self):
+        """Stop serving."""
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def delay(self):
+        """Wait for the latency of a response, return whether the request fails."""
+        self.requests += 1
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+        if failing := self.random.random() < self.error_rate:
+            self.errors += 1
+        return failing
+
+    def disagreeing(self):
+        """Return whether the next transaction is to be altered."""
+        if disagreeing := self.random.random() < self.disagreement_rate:
+            self.disagreements += 1
+        return disagreeing
+
+    def evm_receipt(self, tx_id):
+        """Return the receipt of the EVM transaction `tx_id`."""
+        block_hash = "0x" + hashlib.sha256(tx_id.encode()).hexdigest()
+        logs = [
+            {
+                "address": EVENT_ADDRESS,
+                "blockHash": block_hash,
+                "blockNumber": "0x10",
+                "data": "0x" + payload(tx_id, i, self.payload_size).hex(),
+                "logIndex": hex(i),
+                "removed": False,
+                "topics": [EVENT_TOPIC, "0x" + "00" * 32],
+                "transactionHash": tx_id,
+                "transactionIndex": "0x1",
+            }
+            for i in range(self.events)
+        ]
+        if logs and self.disagreeing():
+            logs[0]["data"] = "0x" + "ff" * self.payload_size
+
+        return {
+            "blockHash": block_hash,
+            "blockNumber": "0x10",
+            "contractAddress": None,
+            "cumulativeGasUsed": "0x1",
+            "effectiveGasPrice": "0x1",
+            "from": "0x" + "22" * 20,
+            "gasUsed": "0x1",
+            "logs": logs,
+            "logsBloom": "0x" + "00" * 256,
+            "status": "0x1",
+            "to": EVENT_ADDRESS,
+            "transactionHash": tx_id,
+            "transactionIndex": "0x1",
+            "type": "0x2",
+        }
+
+    def eos_transaction(self, tx_id):
+        """Return the Hyperion history of the EOS transaction `tx_id`."""
+        block_id = hashlib.sha256(tx_id.encode()).hexdigest()
+        actions = [
+            {
+                "@timestamp": TIMESTAMP,
+                "timestamp": TIMESTAMP,
+                "abi_sequence": 1,
+                "act": {
+                    "account": EOS_ACCOUNT,
+                    "authorization": [{"actor": "alice", "permission": "active"}],
+                    "data": {
+                        "from": "alice",
+                        "to": "bob",
+                        "quantity": "1.0000 EOS",
+                        "memo": payload(tx_id, i, self.payload_size // 2).hex(),
+                    },
+                    "name": EOS_ACTION,
+                },
+                "act_digest": hashlib.sha256(f"{tx_id}:{i}".encode()).hexdigest(),
+                "action_ordinal": i + 1,
+                "block_id": block_id,
+                "block_num": 10,
+                "code_sequence": 1,
+                "creator_action_ordinal": 0,
+                "global_sequence": 100 + i,
+                "producer": "producer",
+                "receipts": [
+                    {
+                        "auth_sequence": [{"account": "alice", "sequence": "1"}],
+                        "global_sequence": str(100 + i),
+                        "receiver": EOS_ACCOUNT,
+                        "recv_sequence": "1",
+                    }
+                ],
+                "trx_id": tx_id,
+                "cpu_usage_us": self.random.randint(100, 200),
+                "net_usage_words": 16,
+                "signatures": ["SIG_K1_standin"],
+                "account_ram_deltas": [],
+                "elapsed": "1",
+                "inline_count": 0,
+                "inline_filtered": False,
+            }
+            for i in range(self.events)
+        ]
+        if actions and self.disagreeing():
+            actions[0]["act"]["data"]["memo"] = "disagreement"
+
+        return {
+            "actions": actions,
+            "cached_lib": False,
+            "executed": True,
+            "last_indexed_block": 11,
+            "last_indexed_block_time": TIMESTAMP,
+            "lib": 9,
+            "query_time_ms": self.random.uniform(1, 10),
+            "trx_id": tx_id,
+        }
+
+    async def evm(self, request):
+        """Reply to `eth_getTransactionReceipt` JSON-RPC requests, single or batched."""
+        body = await request.json()
+        if await self.delay():
+            return web.Response(text="stand-in failure", status=503)
+
+        def reply(call):
+            if call.get("method") != "eth_getTransactionReceipt":
+                error = {"code": -32601, "message": "method not found"}
+                return {"jsonrpc": "2.0", "id": call.get("id"), "error": error}
+            return {
+                "jsonrpc": "2.0",
+                "id": call.get("id"),
+                "result": self.evm_receipt(call["params"][0]),
+            }
+
+        if isinstance(body, list):
+            return web.json_response([reply(call) for call in body])
+        return web.json_response(reply(body))
+
+    async def eos(self, request):
+        """Reply to Hyperion `get_transaction` requests."""
+        if await self.delay():
+            return web.Response(text="stand-in failure", status=503)
+        return web.json_response(self.eos_transaction(request.query["id"]))
+
+    async def stats(self, _request):
+        """Return the stand-in counters."""
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "errors": self.errors,
+                "disagreements": self.disagreements,
+            }
+        )
+
+
+def add_standin_arguments(parser):
+    """Add the stand-in endpoints behaviour arguments to `parser`."""
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="response latency in seconds"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.01,
+        help="extra random response latency, up to these seconds",
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of failing requests"
+    )
+    parser.add_argument(
+        "--disagreement-rate",
+        type=float,
+        default=0.0,
+        help="fraction of transactions reported with altered event data, per endpoint",
+    )
+    parser.add_argument(
+        "--events", type=int, default=1, help="matching events per transaction"
+    )
+    parser.add_argument(
+        "--payload-size", type=int, default=32, help="data bytes per event"
+    )
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+
+
+async def serve(args):
+    """Serve a stand-in endpoint on each of the `args` ports, until cancelled."""
+    standins = [
+        StandIn(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            disagreement_rate=args.disagreement_rate,
+            events=args.events,
+            payload_size=args.payload_size,
+            seed=None if args.seed is None else args.seed + i,
+        )
+        for i in range(len(args.ports))
+    ]
+    try:
+        for standin, port in zip(standins, args.ports):
+            await standin.start(args.host, port)
+        await asyncio.Event().wait()
+    finally:
+        for standin in standins:
+            await standin.close()
+
+
+def main():
+    """Parse the command line and serve the stand-in endpoints."""
+    parser = argparse.ArgumentParser(prog=__name__)
+    parser.add_argument("ports", type=int, nargs="+", help="listening ports")
+    parser.add_argument("--host", default="127.0.0.1", help="listening host")
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
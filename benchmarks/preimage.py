@@ -0,0 +1,128 @@
+"""Per-event preimage encoding benchmark.
+
+Compares the former `bytes` concatenation encoding of EVM logs with `PreimageEncoder`, signing
+excluded. Run with `python -m benchmarks.preimage`."""
+
+import argparse
+import timeit
+
+from eth_account import Account
+
+from attestator.chain import CHAIN, CHAIN_PROTOCOL, EVM
+from attestator.chain.evm.chain import EvmLog
+from attestator.chain.evm.state import TOPICS_HEX_SIZE
+from attestator.chain.preimage import PreimageEncoder
+from attestator.crypto import pk_to_pub
+from attestator.utils import from_0x_hex, pad_bytes_with_zeros, to_0x_hex
+
+
+VERSION = b"\x01"
+PROTOCOL = CHAIN_PROTOCOL[EVM]
+CHAIN_ID = "ethereum"
+
+
+class Signature:  # pylint: disable=too-few-public-methods
+    """Fixed signature, so that only the encoding is measured."""
+
+    r = 2**255 - 19
+    s = 2**254 - 31
+    v = 27
+
+
+def make_log(data_size):
+    """Return an EvmLog with two topics and `data_size` bytes of data."""
+    return EvmLog(
+        address="0x" + "da" * 20,
+        blockHash="0x" + "ab" * 32,
+        blockNumber="0x10",
+        data="0x" + "01" * data_size,
+        logIndex="0x0",
+        removed=False,
+        topics=["0x" + "dd" * 32, "0x" + "00" * 32],
+        transactionHash="0x" + "cd" * 32,
+        transactionIndex="0x1",
+    )
+
+
+def encode_concat(log, key):  # pylint: disable=too-many-locals
+    """Encode and format `log` as `EvmState.sign_logs` formerly did."""
+    chain_id = CHAIN[CHAIN_ID]["id"]
+    block_hash, tx_hash, address, log_data = from_0x_hex(
+        log.blockHash, log.transactionHash, log.address, log.data
+    )
+    topics = pad_bytes_with_zeros(
+        b"".join(from_0x_hex(*log.topics)), 128, pad_right=True
+    )
+    event_payload = address + topics + log_data
+    preimage = VERSION + PROTOCOL + chain_id + block_hash + tx_hash + event_payload
+
+    event_id, signature = bytes(32), Signature
+    event_id, r, s, v, version, protocol, chain_id, event_payload = to_0x_hex(
+        event_id,
+        signature.r.to_bytes(32),
+        signature.s.to_bytes(32),
+        signature.v.to_bytes(),
+        VERSION,
+        PROTOCOL,
+        chain_id,
+        event_payload,
+    )
+    return preimage, {
+        "version": version,
+        "protocol": protocol,
+        "origin": chain_id,
+        "data": log.data,
+        "tx_id_hash": log.transactionHash,
+        "block_id_hash": log.blockHash,
+        "event_payload": event_payload,
+        "event_id": event_id,
+        "signature": {"r": r, "s": s, "v": v},
+        "public_key": pk_to_pub(key),
+    }
+
+
+def encode_preimage_encoder(log, encoder):
+    """Encode and format `log` as `EvmState.sign_logs` does."""
+    preimage = encoder.encode(
+        log.blockHash[2:],
+        log.transactionHash[2:],
+        log.address[2:],
+        "".join(topic[2:] for topic in log.topics).ljust(TOPICS_HEX_SIZE, "0"),
+        log.data[2:],
+    )
+    return preimage, encoder.signed_event(
+        preimage, (bytes(32), Signature), log.data, log.transactionHash, log.blockHash
+    )
+
+
+def main():
+    """Run the benchmark and print the per-event cost of each encoding."""
+    parser = argparse.ArgumentParser(prog=__name__)
+    parser.add_argument(
+        "-n", "--number", type=int, default=10000, help="events per measurement"
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5, help="measurements, the best is kept"
+    )
+    parser.add_argument(
+        "-s", "--data-size", type=int, default=64, help="log data size in bytes"
+    )
+    args = parser.parse_args()
+
+    # pylint: disable=no-value-for-parameter
+    key = Account.create()
+    log = make_log(args.data_size)
+    encoder = PreimageEncoder(VERSION, PROTOCOL, CHAIN[CHAIN_ID]["id"], pk_to_pub(key))
+
+    assert encode_concat(log, key) == encode_preimage_encoder(log, encoder)
+
+    for name, encode in (
+        ("bytes concatenation", lambda: encode_concat(log, key)),
+        ("PreimageEncoder", lambda: encode_preimage_encoder(log, encoder)),
+    ):
+        best = min(timeit.repeat(encode, number=args.number, repeat=args.repeat))
+        print(f"{name:>20}: {best / args.number * 1e6:8.2f} us/event")
+
+
+if __name__ == "__main__":
+    main()
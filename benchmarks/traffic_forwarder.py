@@ -0,0 +1,166 @@
+"""Traffic forwarder throughput benchmark.
+
+Runs the traffic forwarder in debug mode, in its own process, in front of a local TCP stand-in
+upstream replying to each connection with a fixed-size payload, and downloads it through the
+forwarder over concurrent connections. Reports throughput and forwarder CPU time, on Linux. Run
+with `python -m benchmarks.traffic_forwarder`, extra arguments are passed to the forwarder."""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+HOSTNAME = "upstream.benchmark"
+REQUEST = f"POST / HTTP/1.1\r\nHost: {HOSTNAME}\r\n\r\n".encode()
+RECV_SIZE = 2**18
+STARTUP_TIMEOUT = 10
+
+
+def cpu_time(pid):
+    """Return the CPU time, in seconds, used so far by the Linux process `pid`."""
+    with open(f"/proc/{pid}/stat", encoding="ascii") as stat:
+        # User and system times follow the process name, which might contain spaces
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def free_port():
+    """Return a currently free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_upstream(port, payload):
+    """Start the stand-in upstream, replying to each request with `payload`, then closing."""
+
+    async def reply(reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            # Pre-connected by the forwarder, with --pool-size, and closed unused
+            writer.close()
+            return
+        writer.write(payload)
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(reply, "127.0.0.1", port)
+
+
+async def download(port):
+    """Request the payload through the forwarder on `port`, return the number of bytes received."""
+    loop = asyncio.get_running_loop()
+    buf = memoryview(bytearray(RECV_SIZE))
+    received = 0
+    with socket.socket() as sock:
+        sock.setblocking(False)
+        await loop.sock_connect(sock, ("127.0.0.1", port))
+        await loop.sock_sendall(sock, REQUEST)
+        while size := await loop.sock_recv_into(sock, buf):
+            received += size
+    return received
+
+
+async def wait_listening(port):
+    """Wait for a server to listen on the local `port`."""
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+        else:
+            writer.close()
+            return
+
+
+async def run(args, forwarder_args):
+    """Run the benchmark, return the bytes received, the elapsed time and the forwarder CPU time."""
+    upstream_port, forwarder_port = free_port(), free_port()
+    payload = bytes(args.size * 2**20)
+    upstream = await start_upstream(upstream_port, payload)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".toml") as config:
+        config.write(
+            "[networks.ethereum]\n"
+            f'endpoints = ["https://{HOSTNAME}/"]\n'
+            "consensus_threshold = 1\n"
+            "events = []\n"
+        )
+        config.flush()
+
+        forwarder = subprocess.Popen(  # pylint: disable=consider-using-with
+            [
+                sys.executable,
+                "-m",
+                "attestator.traffic_forwarder",
+                config.name,
+                "--debug",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(forwarder_port),
+                "--out-port",
+                str(upstream_port),
+                *forwarder_args,
+            ],
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            await wait_listening(forwarder_port)
+
+            start, cpu_start = time.monotonic(), cpu_time(forwarder.pid)
+            received = 0
+            for _ in range(args.rounds):
+                received += sum(
+                    await asyncio.gather(
+                        *(download(forwarder_port) for _ in range(args.connections))
+                    )
+                )
+            elapsed, cpu = time.monotonic() - start, cpu_time(forwarder.pid) - cpu_start
+        finally:
+            forwarder.terminate()
+            forwarder.wait()
+            # Lets the stand-in upstream see the forwarder's idle connections closed
+            await asyncio.sleep(0.1)
+            upstream.close()
+
+    expected = args.rounds * args.connections * len(payload)
+    if received != expected:
+        raise RuntimeError(f"Received {received} bytes, expected {expected}")
+    return received, elapsed, cpu
+
+
+def main():
+    """Run the benchmark and print throughput and forwarder CPU time."""
+    parser = argparse.ArgumentParser(prog=__name__)
+    parser.add_argument(
+        "-c", "--connections", type=int, default=8, help="concurrent connections"
+    )
+    parser.add_argument(
+        "-s", "--size", type=int, default=16, help="payload size per connection in MiB"
+    )
+    parser.add_argument(
+        "-r", "--rounds", type=int, default=4, help="rounds of concurrent connections"
+    )
+    args, forwarder_args = parser.parse_known_args()
+
+    received, elapsed, cpu = asyncio.run(run(args, forwarder_args))
+
+    gib = received / 2**30
+    print(f"forwarder arguments: {' '.join(forwarder_args) or '(defaults)'}")
+    print(f"{'throughput':>20}: {received / 2**20 / elapsed:8.1f} MiB/s")
+    print(f"{'forwarder cpu':>20}: {cpu / gib:8.2f} s/GiB")
+    print(f"{'cpus':>20}: {os.cpu_count()}")
+
+
+if __name__ == "__main__":
+    main()